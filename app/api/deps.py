@@ -1,15 +1,94 @@
+import base64
+import hashlib
+import json
+import time
+from collections import OrderedDict
 from typing import Optional
 
 from fastapi import HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import Client
 from app.core.supabase import get_supabase_client
 
+# Build the client once at import — same pattern as the crud modules.
+_supabase = get_supabase_client()
+
+# Cache of validated tokens so repeat requests from the same user skip
+# the Supabase auth round-trip. Keyed by a SHA-256 of the bearer token
+# (never the raw token), bounded so memory can't grow without limit.
+# Entries store an absolute deadline: the cache TTL capped by the JWT's
+# own exp claim, so a token is never served past its real expiry.
+_TOKEN_CACHE: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_TOKEN_CACHE_TTL = 300.0
+_TOKEN_CACHE_MAX = 10_000
+
+# Negative cache: tokens Supabase already rejected. A bad token never
+# becomes valid, so briefly remembering failures short-circuits repeated
+# unauthorized requests (retry storms, misconfigured clients) before any
+# network work happens.
+_FAILED_TOKEN_CACHE: "OrderedDict[str, float]" = OrderedDict()
+_FAILED_TOKEN_TTL = 30.0
+_FAILED_TOKEN_MAX = 10_000
 
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
 
 
+def _token_exp(token: str) -> Optional[float]:
+    """Best-effort read of the JWT exp claim (no signature check — the
+    token was already verified by Supabase; this only caps cache life)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except Exception:
+        return None
+
+
+def _token_cache_get(token: str) -> Optional[dict]:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    entry = _TOKEN_CACHE.get(key)
+    if entry and time.time() < entry[0]:
+        return entry[1]
+    if entry:
+        _TOKEN_CACHE.pop(key, None)
+    return None
+
+
+def _token_cache_put(token: str, user: dict) -> None:
+    now = time.time()
+    deadline = now + _TOKEN_CACHE_TTL
+    exp = _token_exp(token)
+    if exp is not None:
+        deadline = min(deadline, exp)
+    if deadline <= now:
+        return  # token expires before it could ever be served from cache
+    key = hashlib.sha256(token.encode()).hexdigest()
+    _TOKEN_CACHE[key] = (deadline, user)
+    _TOKEN_CACHE.move_to_end(key)
+    while len(_TOKEN_CACHE) > _TOKEN_CACHE_MAX:
+        _TOKEN_CACHE.popitem(last=False)
+
+
+def _token_known_bad(token: str) -> bool:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    ts = _FAILED_TOKEN_CACHE.get(key)
+    if ts is not None and time.monotonic() - ts < _FAILED_TOKEN_TTL:
+        return True
+    if ts is not None:
+        _FAILED_TOKEN_CACHE.pop(key, None)
+    return False
+
+
+def _token_mark_bad(token: str) -> None:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    _FAILED_TOKEN_CACHE[key] = time.monotonic()
+    _FAILED_TOKEN_CACHE.move_to_end(key)
+    while len(_FAILED_TOKEN_CACHE) > _FAILED_TOKEN_MAX:
+        _FAILED_TOKEN_CACHE.popitem(last=False)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
@@ -25,22 +104,37 @@ async def get_current_user(
     Raises:
         HTTPException: 401 if token is invalid or expired
     """
+    cached = _token_cache_get(credentials.credentials)
+    if cached is not None:
+        return cached
+    if _token_known_bad(credentials.credentials):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication token"
+        )
+
     try:
-        supabase: Client = get_supabase_client()
-        user_response = supabase.auth.get_user(credentials.credentials)
-        
+        # supabase-py is synchronous — run it in the threadpool so the
+        # blocking HTTP call doesn't stall the event loop (see LEARNINGS.md).
+        user_response = await run_in_threadpool(
+            _supabase.auth.get_user, credentials.credentials
+        )
+
         if not user_response.user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication token"
             )
-        
-        return {
+
+        user = {
             "id": user_response.user.id,
             "email": user_response.user.email,
             "user_metadata": user_response.user.user_metadata,
         }
+        _token_cache_put(credentials.credentials, user)
+        return user
     except Exception as e:
+        _token_mark_bad(credentials.credentials)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid authentication: {str(e)}"
@@ -57,15 +151,23 @@ async def optional_get_current_user(
     """
     if credentials is None:
         return None
+    cached = _token_cache_get(credentials.credentials)
+    if cached is not None:
+        return cached
+    if _token_known_bad(credentials.credentials):
+        return None
     try:
-        supabase: Client = get_supabase_client()
-        user_response = supabase.auth.get_user(credentials.credentials)
+        user_response = await run_in_threadpool(
+            _supabase.auth.get_user, credentials.credentials
+        )
         if not user_response.user:
             return None
-        return {
+        user = {
             "id": user_response.user.id,
             "email": user_response.user.email,
             "user_metadata": user_response.user.user_metadata,
         }
+        _token_cache_put(credentials.credentials, user)
+        return user
     except Exception:
         return None  # silent fail — guest requests are fine
@@ -1,6 +1,19 @@
+import asyncio
+import base64
+import binascii
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from uuid import UUID
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+try:
+    from itertools import batched  # Python 3.12+
+except ImportError:  # pragma: no cover - fallback for older interpreters
+    from itertools import islice
+
+    def batched(iterable, n):
+        it = iter(iterable)
+        while batch := tuple(islice(it, n)):
+            yield batch
 from app.api.deps import get_current_user
 from app.crud import analysis as crud_analysis
 from app.schemas import analysis as schemas_analysis
@@ -15,6 +28,9 @@ MIN_TRACKS = 5
 DEFAULT_TRACK_LIMIT = 50
 MAX_TRACK_LIMIT = 100
 
+# Spotify's audio-features endpoint accepts at most 100 IDs per request
+SPOTIFY_AUDIO_FEATURES_BATCH = 100
+
 
 def extract_track_metadata(track_items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
     """
@@ -26,22 +42,24 @@ def extract_track_metadata(track_items: List[Dict[str, Any]]) -> Dict[str, Dict[
     Returns:
         Dict mapping track_id to {name, artists}
     """
-    metadata = {}
-    for item in track_items:
-        track = item.get("track")
-        if not track or not track.get("id"):
-            continue
-        
-        track_id = track["id"]
-        metadata[track_id] = {
+    return {
+        track["id"]: {
             "name": track.get("name", "Unknown Track"),
-            "artists": [artist.get("name", "Unknown Artist") for artist in track.get("artists", [])],
+            "artists": [
+                artist.get("name", "Unknown Artist")
+                for artist in track.get("artists", ())
+            ],
         }
-    
-    return metadata
+        for item in track_items
+        if (track := item.get("track")) and track.get("id")
+    }
 
 
-@router.post("/analyze/{playlist_id}", response_model=schemas_analysis.PlaylistAnalysisResponse)
+# No response_model on the analysis-returning routes: mood_results is
+# produced by our own analyze_playlist_mood, so the schemas are built
+# with model_construct (see app/schemas/analysis.py) and re-validating
+# them per response would only add latency.
+@router.post("/analyze/{playlist_id}")
 async def analyze_playlist(
     playlist_id: str,
     current_user: dict = Depends(get_current_user),
@@ -56,25 +74,31 @@ async def analyze_playlist(
     - Requires minimum 5 tracks for meaningful analysis
     - Returns mood classification, distribution, confidence, and top tracks
     """
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     
     try:
         # Get valid access token
         access_token = await spotify_api.get_valid_spotify_token(user_id)
         
-        # Get playlist info
-        playlist_info = await spotify_api.get_playlist_info(access_token, playlist_id)
+        # Playlist info and tracks don't depend on each other once we have
+        # the token — fetch them concurrently to save a round-trip.
+        playlist_info, tracks_data = await asyncio.gather(
+            spotify_api.get_playlist_info(access_token, playlist_id),
+            spotify_api.get_playlist_tracks(access_token, playlist_id, limit=limit),
+        )
         playlist_name = playlist_info.get("name", "Unknown Playlist")
         
-        # Get playlist tracks (fetch up to limit)
-        tracks_data = await spotify_api.get_playlist_tracks(access_token, playlist_id, limit=limit)
-        
         # Extract track items
         track_items = tracks_data.get("items", [])
         
-        # Filter valid tracks and extract IDs
-        valid_items = [item for item in track_items if item.get("track") and item["track"].get("id")]
-        track_ids = [item["track"]["id"] for item in valid_items]
+        # Filter valid tracks and extract IDs in a single pass
+        valid_items = []
+        track_ids = []
+        for item in track_items:
+            track = item.get("track")
+            if track and (track_id := track.get("id")):
+                valid_items.append(item)
+                track_ids.append(track_id)
         
         if not track_ids:
             raise HTTPException(
@@ -96,13 +120,29 @@ async def analyze_playlist(
         # Extract track metadata for top tracks display
         track_metadata = extract_track_metadata(valid_items)
         
-        # Get audio features in batches (max 100 per request)
-        all_audio_features = []
-        for i in range(0, len(track_ids), 100):
-            batch = track_ids[i : i + 100]
-            features_data = await spotify_api.get_audio_features(access_token, batch)
-            all_audio_features.extend(features_data.get("audio_features", []))
-        
+        # Get audio features in batches (max 100 per request).
+        # Batches are independent, so fetch them concurrently — gather
+        # preserves input order, keeping mood results deterministic.
+        results = await asyncio.gather(
+            *(
+                spotify_api.get_audio_features(access_token, list(batch))
+                for batch in batched(track_ids, SPOTIFY_AUDIO_FEATURES_BATCH)
+            )
+        )
+        # Spotify returns null entries for tracks it has no features for —
+        # drop them here so downstream code never sees None rows.
+        all_audio_features = [
+            f
+            for r in results
+            for f in r.get("audio_features", ())
+            if isinstance(f, dict)
+        ]
+        if not all_audio_features:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No audio features available for this playlist",
+            )
+
         # Analyze mood with track metadata
         mood_results = analyze_playlist_mood(all_audio_features, track_metadata)
         
@@ -110,8 +150,8 @@ async def analyze_playlist(
         analysis = await crud_analysis.create_playlist_analysis(
             user_id, playlist_id, playlist_name, mood_results
         )
-        
-        return analysis
+
+        return schemas_analysis.build_playlist_analysis_response(analysis)
     except HTTPException:
         raise
     except ValueError as e:
@@ -126,31 +166,66 @@ async def analyze_playlist(
         )
 
 
-@router.get("/history", response_model=schemas_analysis.AnalysisHistoryResponse)
+def _encode_history_cursor(row: Dict[str, Any]) -> str:
+    """Encode a keyset cursor (created_at|id) for the row after this one."""
+    raw = f"{row['created_at']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_history_cursor(cursor: str) -> str:
+    """Decode a history cursor back to its created_at timestamp."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, _, _ = raw.partition("|")
+        if not created_at:
+            raise ValueError("empty cursor")
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    return created_at
+
+
+@router.get("/history")
 async def get_analysis_history(
     current_user: dict = Depends(get_current_user),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
 ):
-    """Get user's analysis history."""
-    user_id = UUID(current_user["id"])
-    analyses = await crud_analysis.get_user_analyses(
-        user_id, limit=limit, offset=offset
+    """Get user's analysis history.
+
+    Pass the ``next_cursor`` from a previous page to paginate by keyset
+    (an index seek, regardless of depth); ``offset`` remains supported
+    but degrades linearly on deep pages.
+    """
+    user_id = current_user["id"]
+    before = _decode_history_cursor(cursor) if cursor else None
+    analyses, total = await crud_analysis.get_user_analyses(
+        user_id, limit=limit, offset=offset, before=before
     )
-    
-    return schemas_analysis.AnalysisHistoryResponse(
-        analyses=analyses,
-        total=len(analyses),
+
+    next_cursor = (
+        _encode_history_cursor(analyses[-1]) if len(analyses) == limit else None
+    )
+    return schemas_analysis.AnalysisHistoryResponse.model_construct(
+        analyses=[
+            schemas_analysis.build_playlist_analysis_response(row)
+            for row in analyses
+        ],
+        total=total,
+        next_cursor=next_cursor,
     )
 
 
-@router.get("/{analysis_id}", response_model=schemas_analysis.PlaylistAnalysisResponse)
+@router.get("/{analysis_id}")
 async def get_analysis(
     analysis_id: UUID,
     current_user: dict = Depends(get_current_user),
 ):
     """Get a specific analysis by ID."""
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     analysis = await crud_analysis.get_playlist_analysis(analysis_id)
     
     if not analysis:
@@ -166,5 +241,5 @@ async def get_analysis(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this analysis",
         )
-    
-    return analysis
+
+    return schemas_analysis.build_playlist_analysis_response(analysis)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from app.api.v1 import spotify, analysis, song_analysis, audio_upload, catalog
 
+# Responses default to ORJSONResponse app-wide (see app/main.py).
 api_router = APIRouter()
 
 api_router.include_router(spotify.router, prefix="/spotify", tags=["spotify"])
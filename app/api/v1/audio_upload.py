@@ -1,17 +1,51 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException, status
+import asyncio
+import hashlib
 import os
 import time
 from typing import Optional
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.executors import get_audio_pool
 from app.schemas.audio_analysis import AudioFeatures, MoodFromAudio, AudioAnalysisResponse
 from app.services.audio_analysis_service import audio_analysis_service
 
 
 router = APIRouter()
 
+# Read uploads in 1 MiB chunks so an oversized body is rejected as soon as
+# it crosses the limit instead of being buffered whole first.
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Identical bytes produce identical features, so cache analysis results by
+# content digest for a short window. Retried/duplicate uploads (common when
+# users re-submit the same file) skip the librosa pipeline entirely;
+# hashing the payload costs microseconds next to the FFT work it saves.
+_upload_analysis_cache = TTLCache(maxsize=256, ttl=600)
+
+
+async def read_upload_bounded(audio_file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read an UploadFile into memory, aborting with 413 as soon as the
+    cumulative size exceeds max_bytes.
+    """
+    buf = bytearray()
+    while True:
+        chunk = await audio_file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds max size of {settings.MAX_UPLOAD_SIZE_MB} MB",
+            )
+    return bytes(buf)
+
 
 @router.post("/analyze", response_model=AudioAnalysisResponse)
 async def analyze_uploaded_audio(
+    request: Request,
     audio_file: UploadFile = File(...),
     title: Optional[str] = Form(default=None),
     artist: Optional[str] = Form(default=None),
@@ -34,21 +68,37 @@ async def analyze_uploaded_audio(
             detail=f"Unsupported audio format: {extension}",
         )
 
-    file_data = await audio_file.read()
     max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if len(file_data) > max_bytes:
+
+    # Reject obviously oversized uploads from the Content-Length header
+    # before reading any bytes; the bounded read below still guards
+    # against clients that lie about (or omit) the header.
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File exceeds max size of {settings.MAX_UPLOAD_SIZE_MB} MB",
         )
 
+    file_data = await read_upload_bounded(audio_file, max_bytes)
+
     start_time = time.time()
     try:
-        features = audio_analysis_service.analyze_uploaded_audio(
-            file_data=file_data,
-            filename=audio_file.filename,
-        )
-        mood_summary = audio_analysis_service.determine_upload_mood(features)
+        digest = hashlib.sha256(file_data).hexdigest()
+        cached = _upload_analysis_cache.get(digest)
+        if cached is not None:
+            features, mood_summary = cached
+        else:
+            # librosa is CPU-bound — run it in the process pool so the event
+            # loop stays responsive and concurrent analyses use all cores.
+            features = await asyncio.get_running_loop().run_in_executor(
+                get_audio_pool(),
+                audio_analysis_service.analyze_uploaded_audio,
+                file_data,
+                audio_file.filename,
+            )
+            mood_summary = audio_analysis_service.determine_upload_mood(features)
+            _upload_analysis_cache.set(digest, (features, mood_summary))
         processing_time = time.time() - start_time
     except Exception as e:
         raise HTTPException(
@@ -1,3 +1,4 @@
+import asyncio
 import time
 import uuid
 from datetime import datetime, timezone
@@ -8,6 +9,7 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from app.api.deps import optional_get_current_user
 from app.core.config import settings
+from app.core.executors import get_audio_pool
 from app.crud import song_analysis as crud_song_analysis
 from app.schemas.audio_analysis import AudioAnalysisResponse, AudioFeatures, MoodFromAudio
 from app.schemas.catalog_analysis import CatalogAnalyzeRequest
@@ -25,29 +27,40 @@ async def analyze_catalog_track(
     Unauthenticated endpoint — downloads a Jamendo stream URL server-side
     and runs it through the same librosa pipeline as /audio-upload/analyze.
     """
-    # 1. Download audio from Jamendo
+    # 1. Download audio from Jamendo, streaming into a bounded buffer so
+    # an oversized (or mislabeled) track is rejected as soon as the limit
+    # is crossed instead of after the whole body sits in memory.
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    size_detail = f"Track exceeds size limit of {settings.MAX_UPLOAD_SIZE_MB} MB"
+    buffer = bytearray()
     try:
         async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(body.audio_url)
-            resp.raise_for_status()
+            async with client.stream("GET", body.audio_url) as resp:
+                resp.raise_for_status()
+                content_length = resp.headers.get("content-length")
+                if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                    raise HTTPException(status_code=413, detail=size_detail)
+                async for chunk in resp.aiter_bytes(65536):
+                    buffer.extend(chunk)
+                    if len(buffer) > max_bytes:
+                        raise HTTPException(status_code=413, detail=size_detail)
+    except HTTPException:
+        raise
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Could not fetch audio: {e}")
 
-    file_data = resp.content
+    file_data = bytes(buffer)
     filename = f"{body.track_id}.mp3"
 
-    # 2. Validate size
-    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if len(file_data) > max_bytes:
-        raise HTTPException(
-            status_code=413,
-            detail=f"Track exceeds size limit of {settings.MAX_UPLOAD_SIZE_MB} MB",
-        )
-
     # 3. Run rich analysis pipeline (same as /audio-upload/analyze)
     start = time.time()
     try:
-        features = audio_analysis_service.analyze_uploaded_audio(file_data, filename)
+        features = await asyncio.get_running_loop().run_in_executor(
+            get_audio_pool(),
+            audio_analysis_service.analyze_uploaded_audio,
+            file_data,
+            filename,
+        )
         mood_summary = audio_analysis_service.determine_upload_mood(features)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Audio analysis failed: {str(e)}")
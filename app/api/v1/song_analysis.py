@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 import os
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, status, UploadFile
 from uuid import UUID
@@ -5,7 +7,9 @@ from typing import List, Dict, Any, Optional
 import httpx
 import sentry_sdk
 from app.api.deps import get_current_user
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.executors import get_audio_pool
 from app.crud import song_analysis as crud_song_analysis
 from app.schemas import song_analysis as schemas_song
 from app.services import spotify_api
@@ -14,30 +18,124 @@ from app.services.audio_analysis_service import audio_analysis_service
 router = APIRouter()
 
 
-def extract_track_from_item(item: Dict[str, Any]) -> Dict[str, Any]:
+def extract_track_from_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Extract track info from Spotify playlist track item."""
     track = item.get("track", {})
     if not track or not track.get("id"):
         return None
 
-    # Get album image
-    album = track.get("album", {})
-    images = album.get("images", [])
-    image_url = images[0].get("url") if images else None
-
-    # Get artists
-    artists = [artist.get("name", "Unknown Artist") for artist in track.get("artists", [])]
-
     return {
         "id": track["id"],
         "name": track.get("name", "Unknown Track"),
-        "artists": artists,
+        "artists": [
+            artist.get("name", "Unknown Artist")
+            for artist in track.get("artists", ())
+        ],
         "preview_url": track.get("preview_url"),
-        "image_url": image_url,
+        "image_url": next(
+            (img.get("url") for img in (track.get("album") or {}).get("images") or ()),
+            None,
+        ),
         "duration_ms": track.get("duration_ms"),
     }
 
 
+def _validate_and_check_upload(audio_file: UploadFile) -> None:
+    """Validate filename and extension for a song upload (400 on failure)."""
+    if not audio_file.filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Audio file is required",
+        )
+    ext = os.path.splitext(audio_file.filename)[1].lstrip(".").lower()
+    if ext not in settings.ALLOWED_AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported audio format: {ext}",
+        )
+
+
+async def _read_upload_checked(audio_file: UploadFile) -> bytes:
+    """Read the upload, enforcing the configured size limit (413 on failure)."""
+    file_data = await audio_file.read()
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    if len(file_data) > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds max size of {settings.MAX_UPLOAD_SIZE_MB} MB",
+        )
+    return file_data
+
+
+# Content-addressed cache of extracted features: identical bytes always
+# produce identical features, so re-submitted files skip the seconds of
+# librosa DSP entirely. Same pattern as the audio-upload endpoint.
+_features_cache = TTLCache(maxsize=1024, ttl=3600)
+
+
+def _analyze_in_pool(file_data: bytes, filename: str):
+    """
+    Kick off librosa analysis in the process pool and return the awaitable.
+    Returning the future (rather than awaiting here) lets callers overlap
+    the CPU-bound analysis with their own I/O, e.g. metadata fetches.
+    Results are cached by content hash, so duplicate bytes resolve
+    immediately without touching the pool.
+    """
+    loop = asyncio.get_running_loop()
+    digest = hashlib.sha256(file_data).hexdigest()
+    cached = _features_cache.get(digest)
+    if cached is not None:
+        future = loop.create_future()
+        future.set_result(cached)
+        return future
+
+    async def _analyze():
+        features = await loop.run_in_executor(
+            get_audio_pool(),
+            audio_analysis_service.analyze_audio_bytes,
+            file_data,
+            filename,
+        )
+        _features_cache.set(digest, features)
+        return features
+
+    # create_task so the pool dispatch starts now, not at first await.
+    return asyncio.create_task(_analyze())
+
+
+async def _run_song_analysis(
+    user_id: str,
+    features: Dict[str, Any],
+    track_name: str,
+    artist_name: str,
+    track_id: Optional[str],
+) -> schemas_song.SongAnalysisResponse:
+    """
+    Shared tail of both song endpoints: classify mood from the extracted
+    features, persist the result, and build the response. Inputs are
+    already validated/canonicalized by the callers.
+    """
+    mood = audio_analysis_service.determine_mood(features)
+
+    await crud_song_analysis.create_song_analysis(
+        user_id=user_id,
+        track_name=track_name,
+        artist_name=artist_name,
+        track_id=track_id,
+        mood_results={**mood, **{"features": features}},
+    )
+
+    return schemas_song.SongAnalysisResponse(
+        track_name=track_name,
+        artist_name=artist_name,
+        track_id=track_id,
+        mood=schemas_song.MoodResult(**mood),
+        features=schemas_song.AudioFeatures(**features),
+        success=True,
+        message=f"Analysis complete: {mood['primary_mood']} mood detected",
+    )
+
+
 @router.get("/history", response_model=schemas_song.SongAnalysisHistoryResponse)
 async def get_song_history(
     current_user: dict = Depends(get_current_user),
@@ -45,7 +143,7 @@ async def get_song_history(
     offset: int = Query(0, ge=0),
 ):
     """Get user's song analysis history."""
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     analyses = await crud_song_analysis.get_user_song_analyses(
         user_id, limit=limit, offset=offset
     )
@@ -74,7 +172,7 @@ async def get_playlist_tracks(
     Get first N tracks from a playlist for song selection.
     Returns tracks with preview URLs for analysis.
     """
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
 
     try:
         # Get valid access token
@@ -132,24 +230,8 @@ async def analyze_song(
     Analyze a single song's mood from uploaded/downloaded audio.
     Uses librosa on the audio file and returns mood classification and audio features.
     """
-    if not audio_file.filename:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Audio file is required",
-        )
-    ext = os.path.splitext(audio_file.filename)[1].lstrip(".").lower()
-    if ext not in settings.ALLOWED_AUDIO_FORMATS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported audio format: {ext}",
-        )
-    file_data = await audio_file.read()
-    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if len(file_data) > max_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File exceeds max size of {settings.MAX_UPLOAD_SIZE_MB} MB",
-        )
+    _validate_and_check_upload(audio_file)
+    file_data = await _read_upload_checked(audio_file)
 
     name = track_name or audio_file.filename or "Unknown Track"
     artist = artist_name or "Unknown Artist"
@@ -165,32 +247,17 @@ async def analyze_song(
     )
 
     try:
-        features = audio_analysis_service.analyze_audio_bytes(
-            file_data=file_data,
-            filename=audio_file.filename,
-        )
-        mood = audio_analysis_service.determine_mood(features)
-
-        await crud_song_analysis.create_song_analysis(
-            user_id=UUID(current_user["id"]),
+        features = await _analyze_in_pool(file_data, audio_file.filename)
+        response = await _run_song_analysis(
+            user_id=current_user["id"],
+            features=features,
             track_name=name,
             artist_name=artist,
             track_id=track_id,
-            mood_results={**mood, **{"features": features}},
-        )
-
-        response = schemas_song.SongAnalysisResponse(
-            track_name=name,
-            artist_name=artist,
-            track_id=track_id,
-            mood=schemas_song.MoodResult(**mood),
-            features=schemas_song.AudioFeatures(**features),
-            success=True,
-            message=f"Analysis complete: {mood['primary_mood']} mood detected",
         )
         sentry_sdk.add_breadcrumb(
             category="analysis",
-            message=f"Analysis complete: {mood['primary_mood']}",
+            message=f"Analysis complete: {response.mood.primary_mood}",
             level="info",
         )
         return response
@@ -213,28 +280,17 @@ async def analyze_song_by_id(
     Analyze a song by track ID using your own audio file.
     Fetches track metadata (name, artist) from Spotify; analysis is done with librosa on the uploaded file.
     """
-    if not audio_file.filename:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Audio file is required",
-        )
-    ext = os.path.splitext(audio_file.filename)[1].lstrip(".").lower()
-    if ext not in settings.ALLOWED_AUDIO_FORMATS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported audio format: {ext}",
-        )
-    file_data = await audio_file.read()
-    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if len(file_data) > max_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File exceeds max size of {settings.MAX_UPLOAD_SIZE_MB} MB",
-        )
+    _validate_and_check_upload(audio_file)
+    file_data = await _read_upload_checked(audio_file)
 
     track_name = "Unknown Track"
     artist_name = "Unknown Artist"
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
+
+    # Start the CPU-bound analysis immediately; the Spotify metadata
+    # round-trips below run concurrently with it instead of in front of it.
+    analysis_future = _analyze_in_pool(file_data, audio_file.filename)
+
     try:
         access_token = await spotify_api.get_valid_spotify_token(user_id)
         track_info = await spotify_api.get_track_info(access_token, track_id)
@@ -255,28 +311,13 @@ async def analyze_song_by_id(
     )
 
     try:
-        features = audio_analysis_service.analyze_audio_bytes(
-            file_data=file_data,
-            filename=audio_file.filename,
-        )
-        mood = audio_analysis_service.determine_mood(features)
-
-        await crud_song_analysis.create_song_analysis(
+        features = await analysis_future
+        return await _run_song_analysis(
             user_id=user_id,
+            features=features,
             track_name=track_name,
             artist_name=artist_name,
             track_id=track_id,
-            mood_results={**mood, **{"features": features}},
-        )
-
-        return schemas_song.SongAnalysisResponse(
-            track_name=track_name,
-            artist_name=artist_name,
-            track_id=track_id,
-            mood=schemas_song.MoodResult(**mood),
-            features=schemas_song.AudioFeatures(**features),
-            success=True,
-            message=f"Analysis complete: {mood['primary_mood']} mood detected",
         )
     except Exception as e:
         sentry_sdk.capture_exception(e)
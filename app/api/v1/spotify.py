@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import RedirectResponse
 from datetime import datetime, timedelta, timezone
@@ -5,6 +7,7 @@ from uuid import UUID
 import secrets
 from urllib.parse import urlencode
 from app.api.deps import get_current_user
+from app.core import token_cache
 from app.core.config import settings
 from app.crud import spotify as crud_spotify
 from app.crud import spotify_state as crud_spotify_state
@@ -14,6 +17,26 @@ from app.services import spotify_auth, spotify_api
 router = APIRouter()
 
 
+def _app_redirect(params: dict, status_code: int = status.HTTP_307_TEMPORARY_REDIRECT):
+    """Build the app redirect for /callback outcomes, or None if unset."""
+    base = settings.SPOTIFY_APP_REDIRECT_URI
+    if not base:
+        return None
+    return RedirectResponse(url=f"{base}?{urlencode(params)}", status_code=status_code)
+
+
+def _playlist_item(item: dict) -> dict:
+    """Shape a Spotify playlist object for our API responses."""
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "description": item.get("description"),
+        "tracks_count": (item.get("tracks") or {}).get("total"),
+        "image_url": next((img["url"] for img in item.get("images") or ()), None),
+        "owner_display_name": (item.get("owner") or {}).get("display_name"),
+    }
+
+
 @router.get("/authorize")
 async def authorize_spotify(
     current_user: dict = Depends(get_current_user),
@@ -23,12 +46,14 @@ async def authorize_spotify(
     Returns authorization URL for user to visit.
     """
     try:
-        # Generate and persist state (10 minute TTL)
+        # Build the URL first — it validates Spotify config, so a
+        # misconfigured app fails before we write a state row to the DB.
         state = secrets.token_urlsafe(32)
-        expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
-        await crud_spotify_state.create_state(state, UUID(current_user["id"]), expires_at)
-
         authorize_url = spotify_auth.generate_authorize_url(state)
+
+        # Persist state (10 minute TTL)
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
+        await crud_spotify_state.create_state(state, current_user["id"], expires_at)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -58,53 +83,43 @@ async def spotify_callback(
         await crud_spotify_state.delete_state(state)
 
         token_data = await spotify_auth.exchange_code_for_tokens(code)
-        spotify_user_id = await spotify_auth.get_spotify_user_id(
-            token_data["access_token"]
-        )
+        # The exchange already resolved the user id alongside the token;
+        # only fall back to a separate /v1/me call if that lookup failed.
+        spotify_user_id = token_data.get(
+            "spotify_user_id"
+        ) or await spotify_auth.get_spotify_user_id(token_data["access_token"])
         expires_at = datetime.now(timezone.utc) + timedelta(
             seconds=token_data.get("expires_in", 3600)
         )
 
-        refresh_token = token_data.get("refresh_token")
-        existing = await crud_spotify.get_spotify_connection(user_id)
-
-        if existing:
-            connection = await crud_spotify.update_spotify_connection(
-                existing,
-                token_data["access_token"],
-                refresh_token,
-                expires_at,
-            )
-            refresh_token = connection.get("refresh_token", refresh_token)
-        else:
-            if not refresh_token:
-                raise ValueError("Missing refresh token from Spotify response")
-            await crud_spotify.create_spotify_connection(
-                user_id,
-                spotify_user_id,
-                token_data["access_token"],
-                refresh_token,
-                expires_at,
-            )
-
-        if settings.SPOTIFY_APP_REDIRECT_URI:
-            success_query = urlencode(
-                {"status": "success", "spotify_user_id": spotify_user_id}
-            )
-            redirect_url = f"{settings.SPOTIFY_APP_REDIRECT_URI}?{success_query}"
-            return RedirectResponse(url=redirect_url)
+        # Single round-trip: PostgREST upsert keyed on user_id replaces
+        # the old SELECT-then-INSERT/UPDATE pair. When Spotify omits
+        # refresh_token (re-authorization), the stored one is kept.
+        await crud_spotify.upsert_spotify_connection(
+            user_id,
+            spotify_user_id,
+            token_data["access_token"],
+            token_data.get("refresh_token"),
+            expires_at,
+        )
+
+        redirect = _app_redirect(
+            {"status": "success", "spotify_user_id": spotify_user_id}
+        )
+        if redirect:
+            return redirect
 
         return {
             "message": "Spotify connected successfully",
             "spotify_user_id": spotify_user_id,
         }
     except Exception as e:
-        if settings.SPOTIFY_APP_REDIRECT_URI:
-            error_query = urlencode(
-                {"status": "error", "message": str(e)[:200]}
-            )
-            redirect_url = f"{settings.SPOTIFY_APP_REDIRECT_URI}?{error_query}"
-            return RedirectResponse(url=redirect_url, status_code=status.HTTP_400_BAD_REQUEST)
+        redirect = _app_redirect(
+            {"status": "error", "message": str(e)[:200]},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+        if redirect:
+            return redirect
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to connect Spotify: {str(e)}",
@@ -116,7 +131,7 @@ async def get_spotify_status(
     current_user: dict = Depends(get_current_user),
 ):
     """Check if user has connected Spotify."""
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     connection = await crud_spotify.get_spotify_connection(user_id)
     
     if connection:
@@ -127,35 +142,42 @@ async def get_spotify_status(
     return schemas_spotify.SpotifyStatusResponse(connected=False)
 
 
-@router.get("/profile", response_model=schemas_spotify.SpotifyProfileResponse)
+# No response_model: the payload was just fetched from Spotify and is
+# returned as-is, so a pydantic validation cycle adds latency for no
+# safety. Same for the playlist list endpoints below.
+@router.get("/profile")
 async def get_spotify_profile(
     current_user: dict = Depends(get_current_user),
 ):
     """Fetch the connected Spotify user profile."""
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     try:
         access_token = await spotify_api.get_valid_spotify_token(user_id)
-        profile_data = await spotify_api.get_user_profile(access_token)
-        
-        # Fetch playlists to get count
-        playlists_data = await spotify_api.get_user_playlists(access_token, limit=1, offset=0)
+
+        # Profile and playlist count are independent given the token —
+        # gather them so both ride the shared HTTP/2 connection at once.
+        profile_data, playlists_data = await asyncio.gather(
+            spotify_api.get_user_profile(access_token),
+            spotify_api.get_user_playlists(access_token, limit=1, offset=0),
+        )
         playlists_count = playlists_data.get("total", 0)
 
-        images = profile_data.get("images") or []
-        image_url = images[0]["url"] if images else None
+        image_url = next(
+            (img["url"] for img in profile_data.get("images") or ()), None
+        )
         followers = (profile_data.get("followers") or {}).get("total")
 
-        return schemas_spotify.SpotifyProfileResponse(
-            profile=schemas_spotify.SpotifyProfile(
-                id=profile_data.get("id", ""),
-                display_name=profile_data.get("display_name"),
-                email=profile_data.get("email"),
-                image_url=image_url,
-                followers=followers,
-                playlists_count=playlists_count,
-                product=profile_data.get("product"),
-            )
-        )
+        return {
+            "profile": {
+                "id": profile_data.get("id", ""),
+                "display_name": profile_data.get("display_name"),
+                "email": profile_data.get("email"),
+                "image_url": image_url,
+                "followers": followers,
+                "playlists_count": playlists_count,
+                "product": profile_data.get("product"),
+            }
+        }
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -173,9 +195,10 @@ async def disconnect_spotify(
     current_user: dict = Depends(get_current_user),
 ):
     """Remove Spotify connection for user."""
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     deleted = await crud_spotify.delete_spotify_connection_by_user(user_id)
-    
+    token_cache.invalidate(str(user_id))
+
     if deleted:
         return {"message": "Spotify disconnected successfully"}
     raise HTTPException(
@@ -184,14 +207,45 @@ async def disconnect_spotify(
     )
 
 
-@router.get("/playlists", response_model=schemas_spotify.SpotifyPlaylistsResponse)
+@router.get("/playlists/all")
+async def get_all_playlists(
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Get every playlist for the user in one call.
+
+    Pages past Spotify's 50-item cap server-side (fetched concurrently),
+    so clients don't have to paginate /playlists themselves.
+    """
+    user_id = current_user["id"]
+
+    try:
+        access_token = await spotify_api.get_valid_spotify_token(user_id)
+        items = await spotify_api.get_all_user_playlists(access_token)
+
+        playlists = [_playlist_item(item) for item in items]
+
+        return {"playlists": playlists, "total": len(playlists)}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch playlists: {str(e)}",
+        )
+
+
+@router.get("/playlists")
 async def get_playlists(
     current_user: dict = Depends(get_current_user),
     limit: int = Query(50, ge=1, le=50),
     offset: int = Query(0, ge=0),
 ):
     """Get user's Spotify playlists."""
-    user_id = UUID(current_user["id"])
+    user_id = current_user["id"]
     
     try:
         # Get valid access token
@@ -203,26 +257,11 @@ async def get_playlists(
         )
         
         # Transform to response format
-        playlists = []
-        for item in playlists_data.get("items", []):
-            images = item.get("images", [])
-            image_url = images[0]["url"] if images else None
-            
-            playlists.append(
-                schemas_spotify.SpotifyPlaylist(
-                    id=item["id"],
-                    name=item["name"],
-                    description=item.get("description"),
-                    tracks_count=item.get("tracks", {}).get("total"),
-                    image_url=image_url,
-                    owner_display_name=(item.get("owner") or {}).get("display_name"),
-                )
-            )
-        
-        return schemas_spotify.SpotifyPlaylistsResponse(
-            playlists=playlists,
-            total=playlists_data.get("total", 0),
-        )
+        playlists = [
+            _playlist_item(item) for item in playlists_data.get("items", ())
+        ]
+
+        return {"playlists": playlists, "total": playlists_data.get("total", 0)}
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
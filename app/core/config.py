@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import List, Optional, Union
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -75,6 +76,11 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
 
+    # Size of the asyncio default executor (per uvicorn worker). Catches
+    # everything still offloaded with run_in_executor(None, ...) so those
+    # calls don't queue behind each other on the stock ~32-thread pool.
+    THREAD_POOL_SIZE: int = 64
+
     # Sentry
     SENTRY_DSN_BACKEND: Optional[str] = None
     SENTRY_ENVIRONMENT: str = "development"
@@ -87,4 +93,16 @@ class Settings(BaseSettings):
     )
 
 
-settings = Settings() 
\ No newline at end of file
+settings = Settings()
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the singleton Settings instance.
+
+    Use as a FastAPI dependency (Depends(get_settings)) where override-
+    ability matters; module code can keep importing `settings` directly.
+    The instance is deliberately not frozen — tests monkeypatch
+    individual attributes on it.
+    """
+    return settings 
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Shared executors for offloading work from the event loop.
+
+librosa analysis is CPU-bound (NumPy/FFT heavy) and holds the GIL in
+places, so it runs in a process pool — threads would still serialize and
+a direct call would pin the event loop for hundreds of milliseconds per
+clip. The pool is created lazily so importing this module stays cheap.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+_audio_pool: Optional[ProcessPoolExecutor] = None
+_db_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_audio_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for CPU-bound audio analysis."""
+    global _audio_pool
+    if _audio_pool is None:
+        _audio_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _audio_pool
+
+
+def get_db_pool() -> ThreadPoolExecutor:
+    """Get the shared thread pool for blocking Supabase client calls.
+
+    The CRUD helpers that still use the synchronous supabase-py client
+    run here rather than in asyncio's default executor, so bursts of DB
+    work don't queue behind (or starve) other run_in_executor callers.
+    The threads spend their time blocked on network I/O, so a generous
+    worker count is cheap. Stopgap until those helpers move to the
+    native-async PostgREST client in app/core/postgrest.py.
+    """
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="supabase")
+    return _db_pool
@@ -0,0 +1,124 @@
+"""
+Thin async PostgREST client for Supabase tables.
+
+The supabase-py client is synchronous, so every CRUD call had to be
+wrapped in run_in_executor — under load those wrappers contend for the
+default thread pool and serialize JSON twice. Talking to Supabase's
+PostgREST endpoint directly over a shared httpx.AsyncClient keeps DB
+calls on the event loop with pooled keep-alive connections.
+
+Helpers mirror PostgREST semantics: filters are passed as query params
+(e.g. {"user_id": f"eq.{user_id}"}), writes use Prefer headers to get
+the affected rows back in one round-trip.
+"""
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared PostgREST client, creating it lazily."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                "apikey": settings.SUPABASE_SERVICE_KEY,
+                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
+            },
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        )
+    return _client
+
+
+async def aclose_client() -> None:
+    """Close the shared PostgREST client (called from app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def select(
+    table: str,
+    filters: Dict[str, str],
+    columns: str = "*",
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    count: bool = False,
+) -> tuple:
+    """SELECT rows from a table.
+
+    Returns (rows, total) — total is None unless count=True, in which
+    case PostgREST reports the exact match count via Content-Range.
+    """
+    params: Dict[str, Any] = {"select": columns, **filters}
+    if order:
+        params["order"] = order
+    if limit is not None:
+        params["limit"] = limit
+    if offset is not None:
+        params["offset"] = offset
+    headers = {"Prefer": "count=exact"} if count else {}
+    response = await get_client().get(f"/{table}", params=params, headers=headers)
+    response.raise_for_status()
+    total = None
+    if count:
+        # Content-Range: "0-49/123" — the part after the slash is the total.
+        content_range = response.headers.get("content-range", "")
+        if "/" in content_range:
+            tail = content_range.rsplit("/", 1)[1]
+            total = int(tail) if tail.isdigit() else None
+    return response.json(), total
+
+
+async def select_one(
+    table: str, filters: Dict[str, str], columns: str = "*"
+) -> Optional[dict]:
+    """SELECT a single row, or None if no row matches."""
+    rows, _ = await select(table, filters, columns=columns, limit=1)
+    return rows[0] if rows else None
+
+
+async def insert(table: str, row: Dict[str, Any], upsert_on: Optional[str] = None) -> dict:
+    """INSERT a row (optionally UPSERT on a conflict column); returns it."""
+    params = {}
+    prefer = "return=representation"
+    if upsert_on:
+        params["on_conflict"] = upsert_on
+        prefer = "resolution=merge-duplicates,return=representation"
+    response = await get_client().post(
+        f"/{table}", params=params, json=row, headers={"Prefer": prefer}
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data[0] if data else None
+
+
+async def update(
+    table: str, filters: Dict[str, str], changes: Dict[str, Any]
+) -> List[dict]:
+    """UPDATE matching rows; returns them."""
+    response = await get_client().patch(
+        f"/{table}",
+        params=filters,
+        json=changes,
+        headers={"Prefer": "return=representation"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def delete(table: str, filters: Dict[str, str]) -> List[dict]:
+    """DELETE matching rows; returns them."""
+    response = await get_client().delete(
+        f"/{table}", params=filters, headers={"Prefer": "return=representation"}
+    )
+    response.raise_for_status()
+    return response.json()
@@ -1,15 +1,21 @@
+from functools import lru_cache
+
 from supabase import create_client, Client
 from app.core.config import settings
 
 
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Get Supabase client with anon key"""
+    """Get the shared Supabase client with anon key.
+
+    Cached so every caller reuses one client (and its keep-alive HTTP
+    session) instead of paying client construction and a fresh TLS
+    handshake per call.
+    """
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 
+@lru_cache(maxsize=1)
 def get_supabase_service_client() -> Client:
-    """Get Supabase client with service role key (for admin operations)"""
+    """Get the shared Supabase client with service role key (for admin operations)."""
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
-
-
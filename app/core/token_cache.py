@@ -0,0 +1,61 @@
+"""
+In-process cache for Spotify access tokens.
+
+Every Spotify-backed endpoint calls get_valid_spotify_token, which used
+to hit Supabase on each request. Tokens are valid for an hour, so serving
+them from memory (with a safety buffer before expiry) turns that DB
+round-trip into a dict lookup. Single-worker deployment (Railway) means
+process-local state is fine here.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.core.cache import TTLCache
+
+# Stop serving a cached token this many seconds before it actually
+# expires, so in-flight requests never carry a token that dies mid-call.
+EXPIRY_SAFETY_BUFFER = 300.0
+
+# Tokens live at most ~1h; the TTL here is a backstop — the real expiry
+# check is the per-entry expires_at below.
+_tokens = TTLCache(maxsize=10_000, ttl=3000)
+
+# Per-user locks so concurrent requests for the same user don't trigger
+# duplicate refreshes (thundering herd on Spotify's token endpoint).
+_locks: Dict[str, asyncio.Lock] = {}
+_LOCKS_MAX = 10_000
+
+
+def get_token(user_id: str) -> Optional[str]:
+    """Return a cached token for user_id, or None if absent/near expiry."""
+    entry = _tokens.get(user_id)
+    if entry is None:
+        return None
+    token, expires_at = entry
+    if time.time() >= expires_at - EXPIRY_SAFETY_BUFFER:
+        _tokens.pop(user_id)
+        return None
+    return token
+
+
+def set_token(user_id: str, token: str, expires_at: float) -> None:
+    """Cache token for user_id until the given epoch expiry."""
+    _tokens.set(user_id, (token, expires_at))
+
+
+def invalidate(user_id: str) -> None:
+    """Drop the cached token (e.g. on disconnect)."""
+    _tokens.pop(user_id)
+
+
+def lock_for(user_id: str) -> asyncio.Lock:
+    """Return the per-user refresh lock, creating it on first use."""
+    lock = _locks.get(user_id)
+    if lock is None:
+        if len(_locks) >= _LOCKS_MAX:
+            # Drop locks nobody is holding; a rebuilt lock is still correct.
+            for key in [k for k, v in _locks.items() if not v.locked()]:
+                del _locks[key]
+        lock = _locks.setdefault(user_id, asyncio.Lock())
+    return lock
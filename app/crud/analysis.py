@@ -1,75 +1,60 @@
-import asyncio
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 from uuid import UUID
-from app.core.supabase import get_supabase_service_client
 
-_supabase = get_supabase_service_client()
+from app.core import postgrest
 
 
 async def create_playlist_analysis(
-    user_id: UUID,
+    user_id: Union[str, UUID],
     playlist_id: str,
     playlist_name: str,
     mood_results: dict,
 ) -> dict:
     """Create a new playlist analysis in Supabase."""
-    loop = asyncio.get_running_loop()
-
-    def _insert():
-        resp = (
-            _supabase.table("playlist_analyses")
-            .insert(
-                {
-                    "user_id": str(user_id),
-                    "playlist_id": playlist_id,
-                    "playlist_name": playlist_name,
-                    "mood_results": mood_results,
-                }
-            )
-            .execute()
-        )
-        data = resp.data or []
-        return data[0] if data else None
-
-    return await loop.run_in_executor(None, _insert)
+    return await postgrest.insert(
+        "playlist_analyses",
+        {
+            "user_id": str(user_id),
+            "playlist_id": playlist_id,
+            "playlist_name": playlist_name,
+            "mood_results": mood_results,
+        },
+    )
 
 
 async def get_playlist_analysis(analysis_id: UUID) -> Optional[dict]:
     """Get a specific playlist analysis by ID from Supabase."""
-    loop = asyncio.get_running_loop()
-
-    def _fetch():
-        resp = (
-            _supabase.table("playlist_analyses")
-            .select("*")
-            .eq("id", str(analysis_id))
-            .maybe_single()
-            .execute()
-        )
-        if getattr(resp, "error", None):
-            raise ValueError(resp.error.message)
-        return resp.data
-
-    return await loop.run_in_executor(None, _fetch)
+    return await postgrest.select_one(
+        "playlist_analyses", {"id": f"eq.{analysis_id}"}
+    )
 
 
 async def get_user_analyses(
-    user_id: UUID, limit: int = 50, offset: int = 0
-) -> List[dict]:
-    """Get all analyses for a user from Supabase, newest first."""
-    loop = asyncio.get_running_loop()
-
-    def _fetch():
-        resp = (
-            _supabase.table("playlist_analyses")
-            .select("*")
-            .eq("user_id", str(user_id))
-            .order("created_at", desc=True)
-            .range(offset, offset + limit - 1)
-            .execute()
-        )
-        if getattr(resp, "error", None):
-            raise ValueError(resp.error.message)
-        return resp.data or []
-
-    return await loop.run_in_executor(None, _fetch)
+    user_id: Union[str, UUID],
+    limit: int = 50,
+    offset: int = 0,
+    before: Optional[str] = None,
+) -> Tuple[List[dict], int]:
+    """Get a page of a user's analyses (newest first) plus the true total.
+
+    When ``before`` (a created_at timestamp) is given, the page is fetched
+    by keyset: ``created_at < before`` with the index doing the seek, so
+    deep pages don't pay the scan-and-discard cost of a large OFFSET.
+    ``offset`` is kept as the fallback for clients without a cursor.
+
+    The total comes from PostgREST's exact count on the same query, so
+    it reflects all matching rows — not just the page that was returned.
+    """
+    filters = {"user_id": f"eq.{user_id}"}
+    if before is not None:
+        filters["created_at"] = f"lt.{before}"
+        offset = 0
+    rows, total = await postgrest.select(
+        "playlist_analyses",
+        filters,
+        order="created_at.desc",
+        limit=limit,
+        offset=offset,
+        count=True,
+    )
+    return rows, total if total is not None else len(rows)
@@ -1,13 +1,14 @@
 import asyncio
-from typing import List, Optional
+from typing import List, Optional, Union
 from uuid import UUID
+from app.core.executors import get_db_pool
 from app.core.supabase import get_supabase_service_client
 
 _supabase = get_supabase_service_client()
 
 
 async def create_song_analysis(
-    user_id: UUID,
+    user_id: Union[str, UUID],
     track_name: str,
     artist_name: str,
     mood_results: dict,
@@ -33,11 +34,11 @@ async def create_song_analysis(
         data = resp.data or []
         return data[0] if data else None
 
-    return await loop.run_in_executor(None, _insert)
+    return await loop.run_in_executor(get_db_pool(), _insert)
 
 
 async def get_user_song_analyses(
-    user_id: UUID, limit: int = 50, offset: int = 0
+    user_id: Union[str, UUID], limit: int = 50, offset: int = 0
 ) -> List[dict]:
     """Get all song analyses for a user from Supabase, newest first."""
     loop = asyncio.get_running_loop()
@@ -55,7 +56,7 @@ async def get_user_song_analyses(
             raise ValueError(resp.error.message)
         return resp.data or []
 
-    return await loop.run_in_executor(None, _fetch)
+    return await loop.run_in_executor(get_db_pool(), _fetch)
 
 
 async def get_song_analysis(analysis_id: UUID) -> Optional[dict]:
@@ -74,4 +75,4 @@ async def get_song_analysis(analysis_id: UUID) -> Optional[dict]:
             raise ValueError(resp.error.message)
         return resp.data
 
-    return await loop.run_in_executor(None, _fetch)
+    return await loop.run_in_executor(get_db_pool(), _fetch)
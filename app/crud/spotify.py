@@ -1,64 +1,65 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Union
 from uuid import UUID
-import asyncio
-from app.core.supabase import get_supabase_service_client
 
-# Use the Supabase service client so we can write to tables.
-_supabase = get_supabase_service_client()
+from app.core import postgrest
 
 
 async def get_spotify_connection(
-    user_id: UUID,
+    user_id: Union[str, UUID],
 ) -> Optional[dict]:
     """Get Spotify connection for a user."""
-    loop = asyncio.get_running_loop()
-
-    def _fetch():
-        resp = (
-            _supabase.table("spotify_connections")
-            .select("*")
-            .eq("user_id", str(user_id))
-            .maybe_single()
-            .execute()
-        )
-        if not resp or resp.data is None:
-            return None
-        if getattr(resp, "error", None):
-            raise ValueError(resp.error.message)
-        return resp.data
-
-    return await loop.run_in_executor(None, _fetch)
+    return await postgrest.select_one(
+        "spotify_connections", {"user_id": f"eq.{user_id}"}
+    )
 
 
 async def create_spotify_connection(
-    user_id: UUID,
+    user_id: Union[str, UUID],
     spotify_user_id: str,
     access_token: str,
     refresh_token: str,
     expires_at: datetime,
 ) -> dict:
     """Create a new Spotify connection."""
-    loop = asyncio.get_running_loop()
-
-    def _insert():
-        resp = (
-            _supabase.table("spotify_connections")
-            .insert(
-                {
-                    "user_id": str(user_id),
-                    "spotify_user_id": spotify_user_id,
-                    "access_token": access_token,
-                    "refresh_token": refresh_token,
-                    "expires_at": expires_at.isoformat(),
-                }
-            )
-            .execute()
-        )
-        data = resp.data or []
-        return data[0] if data else None
-
-    return await loop.run_in_executor(None, _insert)
+    return await postgrest.insert(
+        "spotify_connections",
+        {
+            "user_id": str(user_id),
+            "spotify_user_id": spotify_user_id,
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expires_at": expires_at.isoformat(),
+        },
+    )
+
+
+async def upsert_spotify_connection(
+    user_id: Union[str, UUID],
+    spotify_user_id: str,
+    access_token: str,
+    refresh_token: Optional[str],
+    expires_at: datetime,
+) -> dict:
+    """Create or update a user's Spotify connection in one round-trip.
+
+    Uses PostgREST's on_conflict upsert keyed on user_id, so the OAuth
+    callback no longer needs a SELECT-then-INSERT/UPDATE pair. Spotify
+    omits refresh_token on re-authorization; passing None leaves the
+    stored one untouched.
+    """
+    row = {
+        "user_id": str(user_id),
+        "spotify_user_id": spotify_user_id,
+        "access_token": access_token,
+        "expires_at": expires_at.isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if refresh_token:
+        row["refresh_token"] = refresh_token
+    return await postgrest.insert(
+        "spotify_connections", row, upsert_on="user_id"
+    )
 
 
 async def update_spotify_connection(
@@ -68,7 +69,6 @@ async def update_spotify_connection(
     expires_at: Optional[datetime] = None,
 ) -> dict:
     """Update an existing Spotify connection."""
-    loop = asyncio.get_running_loop()
     updates = {
         "access_token": access_token,
         "updated_at": datetime.now(timezone.utc).isoformat(),
@@ -78,17 +78,10 @@ async def update_spotify_connection(
     if expires_at:
         updates["expires_at"] = expires_at.isoformat()
 
-    def _update():
-        resp = (
-            _supabase.table("spotify_connections")
-            .update(updates)
-            .eq("id", connection["id"])
-            .execute()
-        )
-        data = resp.data or []
-        return data[0] if data else connection
-
-    return await loop.run_in_executor(None, _update)
+    rows = await postgrest.update(
+        "spotify_connections", {"id": f"eq.{connection['id']}"}, updates
+    )
+    return rows[0] if rows else connection
 
 
 async def delete_spotify_connection(
@@ -99,19 +92,10 @@ async def delete_spotify_connection(
 
 
 async def delete_spotify_connection_by_user(
-    user_id: UUID,
+    user_id: Union[str, UUID],
 ) -> bool:
     """Delete Spotify connection for a user."""
-    loop = asyncio.get_running_loop()
-
-    def _delete():
-        resp = (
-            _supabase.table("spotify_connections")
-            .delete()
-            .eq("user_id", str(user_id))
-            .execute()
-        )
-        return resp.data
-
-    data = await loop.run_in_executor(None, _delete)
-    return bool(data)
+    rows = await postgrest.delete(
+        "spotify_connections", {"user_id": f"eq.{user_id}"}
+    )
+    return bool(rows)
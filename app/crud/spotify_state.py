@@ -1,73 +1,77 @@
 from datetime import datetime, timezone
 from uuid import UUID
-import asyncio
-from typing import Optional
-from app.core.supabase import get_supabase_service_client
-
-_supabase = get_supabase_service_client()
-
-
-async def create_state(state: str, user_id: UUID, expires_at: datetime) -> None:
-    loop = asyncio.get_running_loop()
-
-    def _insert():
-        _supabase.table("spotify_oauth_states").insert(
-            {
-                "state": state,
-                "user_id": str(user_id),
-                "expires_at": expires_at.isoformat(),
-            }
-        ).execute()
-
-    await loop.run_in_executor(None, _insert)
+from typing import Optional, Union
+from app.core import postgrest
+from app.core.cache import TTLCache
+
+# OAuth states are ephemeral 10-minute CSRF nonces, and this deployment
+# runs a single instance, so a process-local cache answers the callback's
+# lookup without a Supabase SELECT. The table is still written as the
+# durable fallback (process restarts mid-handshake).
+_state_cache = TTLCache(maxsize=10_000, ttl=600)
+
+
+async def create_state(state: str, user_id: Union[str, UUID], expires_at: datetime) -> None:
+    _state_cache.set(
+        state,
+        {
+            "state": state,
+            "user_id": str(user_id),
+            "expires_at": expires_at.isoformat(),
+        },
+    )
+    await postgrest.insert(
+        "spotify_oauth_states",
+        {
+            "state": state,
+            "user_id": str(user_id),
+            "expires_at": expires_at.isoformat(),
+        },
+    )
 
 
 async def get_state(state: str) -> Optional[dict]:
     """
-    Fetch a state record. If expired, delete and return None.
-    """
-    loop = asyncio.get_running_loop()
-
-    def _fetch():
-        resp = (
-            _supabase.table("spotify_oauth_states")
-            .select("*")
-            .eq("state", state)
-            .maybe_single()
-            .execute()
-        )
-        if not resp or resp.data is None:
-            return None
-        if getattr(resp, "error", None):
-            raise ValueError(resp.error.message)
-        return resp.data
+    Fetch a state record; expired states are treated as missing.
 
-    record = await loop.run_in_executor(None, _fetch)
-    if not record:
+    The expiry check rides on the query itself (expires_at > now), so
+    the expired case costs the same single round-trip as a miss instead
+    of a SELECT followed by a DELETE. Expired rows are left for the
+    periodic purge rather than deleted lazily here.
+    """
+    now = datetime.now(timezone.utc)
+    cached = _state_cache.get(state)
+    if cached is not None:
+        # The cache TTL matches the state lifetime, but the row's own
+        # expires_at is still authoritative — don't serve a stale hit.
+        if now < datetime.fromisoformat(cached["expires_at"]):
+            return cached
+        _state_cache.pop(state)
         return None
 
-    expires_at = record.get("expires_at")
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at and datetime.now(timezone.utc) >= expires_at:
-        await delete_state(state)
-        return None
+    return await postgrest.select_one(
+        "spotify_oauth_states",
+        {"state": f"eq.{state}", "expires_at": f"gt.{now.isoformat()}"},
+    )
 
-    return record
 
+async def purge_expired_states() -> int:
+    """Delete every expired state row in one indexed statement.
 
-async def delete_state(state: str) -> bool:
-    loop = asyncio.get_running_loop()
+    Called periodically from the app lifespan; get_state never deletes,
+    so this is the only thing keeping the table from accumulating
+    abandoned handshakes. Returns the number of rows removed.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    deleted = await postgrest.delete(
+        "spotify_oauth_states", {"expires_at": f"lt.{now}"}
+    )
+    return len(deleted)
 
-    def _delete():
-        resp = (
-            _supabase.table("spotify_oauth_states")
-            .delete()
-            .eq("state", state)
-            .execute()
-        )
-        return resp.data
 
-    data = await loop.run_in_executor(None, _delete)
+async def delete_state(state: str) -> bool:
+    _state_cache.pop(state)
+    data = await postgrest.delete(
+        "spotify_oauth_states", {"state": f"eq.{state}"}
+    )
     return bool(data)
-
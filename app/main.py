@@ -1,10 +1,24 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
+from app.core import postgrest
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.crud import spotify_state as crud_spotify_state
+from app.services import spotify_api
+
+logger = logging.getLogger(__name__)
+
+# How often the background task sweeps expired OAuth states.
+STATE_PURGE_INTERVAL_SECONDS = 60
 
 # Initialize Sentry before creating the FastAPI app
 if settings.SENTRY_ENABLE and settings.SENTRY_DSN_BACKEND:
@@ -19,11 +33,51 @@ if settings.SENTRY_ENABLE and settings.SENTRY_DSN_BACKEND:
         send_default_pii=False,
     )
 
+async def _purge_states_loop():
+    """Sweep expired spotify_oauth_states rows once a minute.
+
+    One indexed batch delete replaces per-request lazy deletes and keeps
+    the table (and its expires_at index) from growing without bound.
+    """
+    while True:
+        await asyncio.sleep(STATE_PURGE_INTERVAL_SECONDS)
+        try:
+            await crud_spotify_state.purge_expired_states()
+        except Exception as e:
+            # Non-fatal: the next sweep retries; rows just linger longer.
+            logger.warning(f"OAuth state purge failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Threads here just block on I/O, so a larger default executor is
+    # cheap and keeps run_in_executor(None, ...) callers from queueing
+    # behind each other under burst load.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=settings.THREAD_POOL_SIZE, thread_name_prefix="default"
+        )
+    )
+    purge_task = asyncio.create_task(_purge_states_loop())
+    yield
+    purge_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await purge_task
+    # Close the pooled HTTP clients so keep-alive connections shut
+    # down cleanly instead of being dropped mid-flight.
+    await spotify_api.aclose_client()
+    await postgrest.aclose_client()
+
+
 app = FastAPI(
     title="MoodTune API",
     description="A music mood analysis and playlist generation API",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    # orjson is markedly faster than stdlib json for the float-heavy
+    # analysis payloads and large track lists this API returns.
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Set up CORS
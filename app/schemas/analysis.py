@@ -80,3 +80,51 @@ class AnalyzePlaylistRequest(BaseModel):
 class AnalysisHistoryResponse(BaseModel):
     analyses: list[PlaylistAnalysisResponse]
     total: int
+    # Opaque keyset cursor for the next page; None when this is the last page.
+    next_cursor: str | None = None
+
+
+# ============================================================================
+# Validation-free builders
+# ============================================================================
+#
+# mood_results rows come straight from analyze_playlist_mood (via our own
+# DB write), so their shape is already known-good — re-validating every
+# float on the way out is pure overhead. These builders assemble the
+# models with model_construct, skipping pydantic-core coercion.
+
+def build_mood_result(data: dict) -> MoodResult:
+    """Assemble a MoodResult from analyze_playlist_mood output without validation."""
+    return MoodResult.model_construct(
+        primary_mood=data["primary_mood"],
+        mood_category=data["mood_category"],
+        mood_descriptors=data["mood_descriptors"],
+        confidence=data["confidence"],
+        averages=AudioFeaturesSummary.model_construct(**data["averages"]),
+        mood_distribution=MoodDistribution.model_construct(**data["mood_distribution"]),
+        top_tracks=[
+            TrackAnalysis.model_construct(**track) for track in data["top_tracks"]
+        ],
+        track_count=data["track_count"],
+    )
+
+
+def build_playlist_analysis_response(row: dict) -> PlaylistAnalysisResponse:
+    """Assemble a PlaylistAnalysisResponse from a playlist_analyses row.
+
+    The three typed scalars are coerced by hand (PostgREST rows carry
+    them as strings); everything else is trusted as-is.
+    """
+    created_at = row["created_at"]
+    return PlaylistAnalysisResponse.model_construct(
+        id=UUID(str(row["id"])),
+        user_id=UUID(str(row["user_id"])),
+        playlist_id=row["playlist_id"],
+        playlist_name=row["playlist_name"],
+        mood_results=build_mood_result(row["mood_results"]),
+        created_at=(
+            datetime.fromisoformat(created_at)
+            if isinstance(created_at, str)
+            else created_at
+        ),
+    )
@@ -3,25 +3,29 @@ Playlist mood analysis service.
 
 Analyzes Spotify audio features to determine playlist mood characteristics.
 """
+import math
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+
 
 # ============================================================================
 # Mood Classification Thresholds
 # ============================================================================
 
+# Flat constants for the hot comparisons — one global load instead of
+# two dict lookups apiece.
+HAPPY_VALENCE = 0.6      # >= considered happy
+SAD_VALENCE = 0.4        # < considered sad
+ENERGETIC_ENERGY = 0.6   # >= considered energetic
+CALM_ENERGY = 0.4        # < considered calm
+DANCEABLE_SCORE = 0.6    # >= considered danceable
+
+# Kept for external readers; the code above is the source of truth.
 THRESHOLDS = {
-    "valence": {
-        "happy": 0.6,    # >= 0.6 considered happy
-        "sad": 0.4,      # < 0.4 considered sad
-    },
-    "energy": {
-        "energetic": 0.6,  # >= 0.6 considered energetic
-        "calm": 0.4,       # < 0.4 considered calm
-    },
-    "danceability": {
-        "danceable": 0.6,  # >= 0.6 considered danceable
-    },
+    "valence": {"happy": HAPPY_VALENCE, "sad": SAD_VALENCE},
+    "energy": {"energetic": ENERGETIC_ENERGY, "calm": CALM_ENERGY},
+    "danceability": {"danceable": DANCEABLE_SCORE},
 }
 
 
@@ -40,13 +44,13 @@ def classify_track_mood(valence: float, energy: float) -> str:
     Returns:
         Mood classification string
     """
-    if valence >= 0.6 and energy >= 0.6:
+    if valence >= HAPPY_VALENCE and energy >= ENERGETIC_ENERGY:
         return "Happy & Energetic"
-    elif valence >= 0.6 and energy < 0.6:
+    elif valence >= HAPPY_VALENCE and energy < ENERGETIC_ENERGY:
         return "Happy & Calm"
-    elif valence < 0.4 and energy >= 0.6:
+    elif valence < SAD_VALENCE and energy >= ENERGETIC_ENERGY:
         return "Sad & Energetic"
-    elif valence < 0.4 and energy < 0.6:
+    elif valence < SAD_VALENCE and energy < ENERGETIC_ENERGY:
         return "Sad & Calm"
     else:
         return "Neutral"
@@ -66,22 +70,36 @@ def calculate_mood_distribution(audio_features: List[Dict[str, Any]]) -> Dict[st
     Returns:
         Dict with mood percentages (happy, sad, energetic, calm, danceable)
     """
-    total = len(audio_features)
-    if total == 0:
+    if not audio_features:
         return {"happy": 0, "sad": 0, "energetic": 0, "calm": 0, "danceable": 0}
-    
-    happy_count = sum(1 for f in audio_features if f.get("valence", 0) >= THRESHOLDS["valence"]["happy"])
-    sad_count = sum(1 for f in audio_features if f.get("valence", 0) < THRESHOLDS["valence"]["sad"])
-    energetic_count = sum(1 for f in audio_features if f.get("energy", 0) >= THRESHOLDS["energy"]["energetic"])
-    calm_count = sum(1 for f in audio_features if f.get("energy", 0) < THRESHOLDS["energy"]["calm"])
-    danceable_count = sum(1 for f in audio_features if f.get("danceability", 0) >= THRESHOLDS["danceability"]["danceable"])
-    
+
+    # One pass to build the (N, 3) array, then each bucket is a single
+    # vectorized mask reduction instead of a Python-level generator pass.
+    matrix = np.array(
+        [
+            [f.get("valence", 0), f.get("energy", 0), f.get("danceability", 0)]
+            for f in audio_features
+        ],
+        dtype=np.float32,
+    )
+    return _distribution_from_matrix(matrix)
+
+
+def _distribution_from_matrix(matrix: "np.ndarray") -> Dict[str, float]:
+    """Mood distribution from a feature matrix whose first three columns
+    are valence, energy and danceability (the _AVERAGED_FEATURES order).
+
+    analyze_playlist_mood already builds that matrix for the averages, so
+    it feeds it straight in here rather than re-walking the dicts.
+    """
+    valence, energy, danceability = matrix[:, 0], matrix[:, 1], matrix[:, 2]
+
     return {
-        "happy": round((happy_count / total) * 100, 1),
-        "sad": round((sad_count / total) * 100, 1),
-        "energetic": round((energetic_count / total) * 100, 1),
-        "calm": round((calm_count / total) * 100, 1),
-        "danceable": round((danceable_count / total) * 100, 1),
+        "happy": round(float((valence >= HAPPY_VALENCE).mean()) * 100, 1),
+        "sad": round(float((valence < SAD_VALENCE).mean()) * 100, 1),
+        "energetic": round(float((energy >= ENERGETIC_ENERGY).mean()) * 100, 1),
+        "calm": round(float((energy < CALM_ENERGY).mean()) * 100, 1),
+        "danceable": round(float((danceability >= DANCEABLE_SCORE).mean()) * 100, 1),
     }
 
 
@@ -105,10 +123,7 @@ def calculate_confidence(avg_valence: float, avg_energy: float) -> float:
     """
     # Calculate distance from center point (0.5, 0.5)
     # Maximum distance is ~0.707 (corner to center)
-    center_valence = 0.5
-    center_energy = 0.5
-    
-    distance = ((avg_valence - center_valence) ** 2 + (avg_energy - center_energy) ** 2) ** 0.5
+    distance = math.hypot(avg_valence - 0.5, avg_energy - 0.5)
     max_distance = 0.707  # sqrt(0.5^2 + 0.5^2)
     
     # Normalize to 0-100 scale
@@ -143,42 +158,41 @@ def select_top_tracks(
     Returns:
         List of TrackAnalysis-compatible dicts
     """
-    # Score each track by how "interesting" it is (distance from neutral)
-    scored_tracks = []
-    for features in audio_features:
-        track_id = features.get("id")
-        if not track_id:
-            continue
-            
-        valence = features.get("valence", 0.5)
-        energy = features.get("energy", 0.5)
-        danceability = features.get("danceability", 0.5)
-        
-        # Simple scoring: prefer tracks far from neutral
-        distance_from_center = ((valence - 0.5) ** 2 + (energy - 0.5) ** 2) ** 0.5
-        
-        metadata = track_metadata.get(track_id, {})
-        
-        scored_tracks.append({
-            "track_id": track_id,
+    tracks = [f for f in audio_features if f.get("id")]
+    if not tracks:
+        return []
+
+    # Score every track in one vectorized pass (distance from neutral),
+    # then argpartition picks the top N in O(N) — no reason to fully
+    # sort the tracks that won't be returned.
+    matrix = np.array(
+        [
+            [f.get("valence", 0.5), f.get("energy", 0.5), f.get("danceability", 0.5)]
+            for f in tracks
+        ],
+        dtype=np.float32,
+    )
+    scores = np.hypot(matrix[:, 0] - 0.5, matrix[:, 1] - 0.5)
+
+    count = min(count, len(tracks))
+    top_idx = np.argpartition(scores, -count)[-count:]
+    top_idx = top_idx[np.argsort(-scores[top_idx])]
+
+    top_tracks = []
+    for i in top_idx:
+        features = tracks[i]
+        valence, energy, danceability = (float(v) for v in matrix[i])
+        metadata = track_metadata.get(features["id"], {})
+        top_tracks.append({
+            "track_id": features["id"],
             "track_name": metadata.get("name", "Unknown Track"),
             "artists": metadata.get("artists", []),
             "valence": round(valence, 3),
             "energy": round(energy, 3),
             "danceability": round(danceability, 3),
             "mood_label": classify_track_mood(valence, energy),
-            "_score": distance_from_center,
         })
-    
-    # Sort by score (highest first) and take top N
-    scored_tracks.sort(key=lambda x: x["_score"], reverse=True)
-    
-    # Remove the internal score field before returning
-    top_tracks = []
-    for track in scored_tracks[:count]:
-        track_copy = {k: v for k, v in track.items() if k != "_score"}
-        top_tracks.append(track_copy)
-    
+
     return top_tracks
 
 
@@ -186,6 +200,24 @@ def select_top_tracks(
 # Main Analysis Function
 # ============================================================================
 
+# Primary mood by 2-bit index: (valence > 0.6) << 1 | (energy > 0.6).
+_MOOD_TABLE = (
+    ("Calm & Melancholic", "calm"),      # low valence, low energy
+    ("Intense & Dark", "intense"),       # low valence, high energy
+    ("Happy & Calm", "peaceful"),        # high valence, low energy
+    ("Happy & Energetic", "upbeat"),     # high valence, high energy
+)
+
+# Column order for the vectorized averages below.
+_AVERAGED_FEATURES = (
+    "valence",
+    "energy",
+    "danceability",
+    "tempo",
+    "acousticness",
+    "instrumentalness",
+)
+
 def analyze_playlist_mood(
     audio_features: List[Dict[str, Any]],
     track_metadata: Optional[Dict[str, Dict[str, Any]]] = None,
@@ -200,9 +232,16 @@ def analyze_playlist_mood(
     Returns:
         dict: Complete mood analysis results matching MoodResult schema
     """
-    # Filter out None values (some tracks may not have features)
-    valid_features = [f for f in audio_features if f is not None]
-    
+    # Filter out None values (some tracks may not have features) and
+    # collect the matrix rows in the same pass — one walk over the
+    # input instead of a filter pass plus a matrix-build pass.
+    valid_features = []
+    rows = []
+    for f in audio_features:
+        if f is not None:
+            valid_features.append(f)
+            rows.append([f.get(key, 0) for key in _AVERAGED_FEATURES])
+
     if not valid_features:
         return {
             "primary_mood": "Unknown",
@@ -228,28 +267,25 @@ def analyze_playlist_mood(
             "track_count": 0,
         }
     
-    # Calculate averages
+    # Calculate averages: one (N, F) float32 array reduced column-wise
+    # instead of six Python-level passes.
     total_tracks = len(valid_features)
-    avg_valence = sum(f.get("valence", 0) for f in valid_features) / total_tracks
-    avg_energy = sum(f.get("energy", 0) for f in valid_features) / total_tracks
-    avg_danceability = sum(f.get("danceability", 0) for f in valid_features) / total_tracks
-    avg_tempo = sum(f.get("tempo", 0) for f in valid_features) / total_tracks
-    avg_acousticness = sum(f.get("acousticness", 0) for f in valid_features) / total_tracks
-    avg_instrumentalness = sum(f.get("instrumentalness", 0) for f in valid_features) / total_tracks
+    feature_matrix = np.array(rows, dtype=np.float32)
+    (
+        avg_valence,
+        avg_energy,
+        avg_danceability,
+        avg_tempo,
+        avg_acousticness,
+        avg_instrumentalness,
+    ) = (float(v) for v in feature_matrix.mean(axis=0))
     
-    # Determine primary mood based on valence and energy
-    if avg_valence > 0.6 and avg_energy > 0.6:
-        primary_mood = "Happy & Energetic"
-        mood_category = "upbeat"
-    elif avg_valence > 0.6 and avg_energy <= 0.6:
-        primary_mood = "Happy & Calm"
-        mood_category = "peaceful"
-    elif avg_valence <= 0.6 and avg_energy > 0.6:
-        primary_mood = "Intense & Dark"
-        mood_category = "intense"
-    else:
-        primary_mood = "Calm & Melancholic"
-        mood_category = "calm"
+    # Determine primary mood based on valence and energy — the two
+    # comparisons form a 2-bit index into _MOOD_TABLE, replacing the
+    # old four-branch if/elif chain with the same semantics.
+    primary_mood, mood_category = _MOOD_TABLE[
+        (avg_valence > 0.6) << 1 | (avg_energy > 0.6)
+    ]
     
     # Additional mood descriptors
     mood_descriptors = []
@@ -264,8 +300,9 @@ def analyze_playlist_mood(
     elif avg_tempo < 90:
         mood_descriptors.append("slow-paced")
     
-    # Calculate mood distribution
-    mood_distribution = calculate_mood_distribution(valid_features)
+    # Mood distribution reuses the matrix built for the averages — the
+    # dicts are only walked once per analysis.
+    mood_distribution = _distribution_from_matrix(feature_matrix)
     
     # Calculate confidence score
     confidence = calculate_confidence(avg_valence, avg_energy)
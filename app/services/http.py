@@ -0,0 +1,42 @@
+"""
+Shared outbound HTTP client for Spotify services.
+
+spotify_api and spotify_auth both talk to Spotify's hosts; keeping one
+pooled httpx.AsyncClient between them means TLS handshakes happen once
+per connection, not once per call, and HTTP/2 multiplexes the gathered
+pagination/batch requests over a single socket.
+
+Created lazily (so test doubles that patch httpx.AsyncClient are picked
+up at first use) and closed from the app lifespan.
+"""
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared outbound client, creating it lazily."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            # Granular timeouts bound each phase separately: a stuck
+            # Spotify socket fails fast instead of eating a flat 10s.
+            timeout=httpx.Timeout(connect=2.0, read=5.0, write=5.0, pool=2.0),
+            limits=httpx.Limits(
+                max_connections=200,
+                max_keepalive_connections=50,
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _client
+
+
+async def aclose_client() -> None:
+    """Close the shared client (called from app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
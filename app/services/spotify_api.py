@@ -1,12 +1,49 @@
-import httpx
-from datetime import datetime, timezone, timedelta
+import hashlib
+import logging
+import time
+
+from datetime import datetime, timezone
 from typing import List, Dict, Optional, Union
 from uuid import UUID
 import asyncio
-from app.core.supabase import get_supabase_service_client
+from app.core import postgrest, token_cache
+from app.core.cache import TTLCache
+from app.services import http
 from app.services.spotify_auth import refresh_access_token
 
-_supabase = get_supabase_service_client()
+logger = logging.getLogger(__name__)
+
+# Kick off a background refresh when a still-valid token is this close
+# to expiry, so the next caller never blocks on Spotify's token endpoint.
+# Must exceed token_cache.EXPIRY_SAFETY_BUFFER (300s): the cache stops
+# serving entries inside that buffer, so refreshing ahead of it keeps
+# active users on the cache instead of a per-request DB read while the
+# token winds down.
+_REFRESH_AHEAD_SECONDS = 600.0
+
+# All Spotify calls go through the shared pooled client in
+# app/services/http.py (also used by spotify_auth).
+_get_client = http.get_client
+aclose_client = http.aclose_client
+
+
+# Playlist/track metadata barely changes between a user's back-to-back
+# requests (e.g. re-analyzing the same playlist), so cache it briefly.
+# Keys include a hash of the access token so private data never leaks
+# across users.
+_metadata_cache = TTLCache(maxsize=2048, ttl=60)
+
+
+def _cache_key(access_token: str, *parts) -> tuple:
+    token_hash = hashlib.sha256(access_token.encode()).hexdigest()[:16]
+    return (token_hash, *parts)
+
+
+# Audio features are immutable per track and identical for every user,
+# so they cache globally (no token in the key) and for much longer than
+# the metadata above. Repeat analyses of overlapping playlists only hit
+# Spotify for tracks nobody has asked about yet.
+_audio_features_cache = TTLCache(maxsize=50_000, ttl=24 * 3600)
 
 
 async def get_valid_spotify_token(user_id: Union[str, UUID]) -> str:
@@ -23,63 +60,95 @@ async def get_valid_spotify_token(user_id: Union[str, UUID]) -> str:
     Raises:
         ValueError: If no Spotify connection exists for user
     """
-    loop = asyncio.get_running_loop()
+    cache_key = str(user_id)
+    cached = token_cache.get_token(cache_key)
+    if cached is not None:
+        return cached
 
-    def _fetch():
-        resp = (
-            _supabase.table("spotify_connections")
-            .select("*")
-            .eq("user_id", str(user_id))
-            .maybe_single()
-            .execute()
-        )
-        if not resp or resp.data is None:
-            return None
-        if getattr(resp, "error", None):
-            raise ValueError(resp.error.message)
-        return resp.data
+    # Per-user lock so concurrent cache misses do one DB read/refresh,
+    # not N. Re-check the cache once the lock is held.
+    async with token_cache.lock_for(cache_key):
+        cached = token_cache.get_token(cache_key)
+        if cached is not None:
+            return cached
+        token, expires_epoch = await _load_and_refresh_token(user_id)
+        token_cache.set_token(cache_key, token, expires_epoch)
+        return token
 
-    connection = await loop.run_in_executor(None, _fetch)
+
+async def _load_and_refresh_token(user_id: Union[str, UUID]) -> tuple:
+    """Read the user's connection from Supabase, refreshing if expired.
+
+    Returns (access_token, expires_at_epoch).
+    """
+    connection = await postgrest.select_one(
+        "spotify_connections", {"user_id": f"eq.{user_id}"}
+    )
 
     if not connection:
         raise ValueError("No Spotify connection found for user")
 
-    # Parse expires_at
-    expires_at_str = connection.get("expires_at")
-    expires_at = (
-        datetime.fromisoformat(expires_at_str)
-        if isinstance(expires_at_str, str)
-        else expires_at_str
-    )
+    # Parse expires_at once into an epoch float; all TTL math below is
+    # plain float comparison — datetimes only exist at the DB boundary.
+    expires_at_raw = connection.get("expires_at")
+    expires_epoch = (
+        datetime.fromisoformat(expires_at_raw)
+        if isinstance(expires_at_raw, str)
+        else expires_at_raw
+    ).timestamp()
 
-    if datetime.now(timezone.utc) >= expires_at:
-        token_data = await refresh_access_token(connection["refresh_token"])
-        new_expires_at = datetime.now(timezone.utc) + timedelta(
-            seconds=token_data.get("expires_in", 3600)
-        )
+    now = time.time()
+    if now >= expires_epoch:
+        # Already expired — the caller has to wait for the refresh.
+        return await _refresh_and_store(connection)
 
-        def _update():
-            resp = (
-                _supabase.table("spotify_connections")
-                .update(
-                    {
-                        "access_token": token_data["access_token"],
-                        "expires_at": new_expires_at.isoformat(),
-                        "refresh_token": token_data.get(
-                            "refresh_token", connection["refresh_token"]
-                        ),
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                    }
-                )
-                .eq("id", connection["id"])
-                .execute()
-            )
-            data = resp.data or []
-            return data[0] if data else connection
+    if expires_epoch - now < _REFRESH_AHEAD_SECONDS:
+        # Still valid but close to expiry: serve the current token and
+        # refresh in the background so no request ever blocks on Spotify's
+        # token endpoint.
+        asyncio.create_task(_background_refresh(str(user_id), connection))
+
+    return connection["access_token"], expires_epoch
+
+
+async def _refresh_and_store(connection: Dict) -> tuple:
+    """Refresh the connection's token via Spotify and persist it.
 
-        connection = await loop.run_in_executor(None, _update)
+    Returns (access_token, expires_at_epoch).
+    """
+    token_data = await refresh_access_token(connection["refresh_token"])
+    now = time.time()
+    expires_epoch = now + token_data.get("expires_in", 3600)
+
+    rows = await postgrest.update(
+        "spotify_connections",
+        {"id": f"eq.{connection['id']}"},
+        {
+            "access_token": token_data["access_token"],
+            "expires_at": datetime.fromtimestamp(
+                expires_epoch, tz=timezone.utc
+            ).isoformat(),
+            "refresh_token": token_data.get(
+                "refresh_token", connection["refresh_token"]
+            ),
+            "updated_at": datetime.fromtimestamp(now, tz=timezone.utc).isoformat(),
+        },
+    )
+    updated = rows[0] if rows else connection
+    return updated["access_token"], expires_epoch
 
-    return connection["access_token"]
+
+async def _background_refresh(cache_key: str, connection: Dict) -> None:
+    """Refresh a near-expiry token off the request path and cache it."""
+    async with token_cache.lock_for(cache_key):
+        if token_cache.get_token(cache_key) is not None:
+            return  # another task already refreshed
+        try:
+            token, expires_epoch = await _refresh_and_store(connection)
+            token_cache.set_token(cache_key, token, expires_epoch)
+        except Exception as e:
+            # Non-fatal: the next request falls back to the synchronous path.
+            logger.warning(f"Background token refresh failed: {e}")
 
 
 async def get_user_playlists(access_token: str, limit: int = 50, offset: int = 0) -> Dict:
@@ -94,14 +163,50 @@ async def get_user_playlists(access_token: str, limit: int = 50, offset: int = 0
     Returns:
         dict: Spotify API response with playlists
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.spotify.com/v1/me/playlists",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params={"limit": limit, "offset": offset},
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await _get_client().get(
+        "https://api.spotify.com/v1/me/playlists",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"limit": limit, "offset": offset},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_all_user_playlists(access_token: str) -> List[Dict]:
+    """
+    Get every playlist for the user, paginating past Spotify's 50-item cap.
+
+    The first page reports the total, so the remaining offsets are known
+    up front and fetched concurrently — bounded by a semaphore to stay
+    polite to Spotify's rate limits — instead of one page per round-trip.
+
+    Args:
+        access_token: Valid Spotify access token
+
+    Returns:
+        list: All playlist items, in offset order
+    """
+    page_size = 50
+    first_page = await get_user_playlists(access_token, limit=page_size, offset=0)
+    items = list(first_page.get("items", ()))
+    total = first_page.get("total", len(items))
+    if total <= page_size:
+        return items
+
+    semaphore = asyncio.Semaphore(5)
+
+    async def _fetch_page(offset: int) -> Dict:
+        async with semaphore:
+            return await get_user_playlists(
+                access_token, limit=page_size, offset=offset
+            )
+
+    pages = await asyncio.gather(
+        *(_fetch_page(offset) for offset in range(page_size, total, page_size))
+    )
+    for page in pages:
+        items.extend(page.get("items", ()))
+    return items
 
 
 async def get_user_profile(access_token: str) -> Dict:
@@ -114,13 +219,12 @@ async def get_user_profile(access_token: str) -> Dict:
     Returns:
         dict: Spotify API response with user profile
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.spotify.com/v1/me",
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await _get_client().get(
+        "https://api.spotify.com/v1/me",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    response.raise_for_status()
+    return response.json()
 
 
 async def get_playlist_info(access_token: str, playlist_id: str) -> Dict:
@@ -134,13 +238,18 @@ async def get_playlist_info(access_token: str, playlist_id: str) -> Dict:
     Returns:
         dict: Spotify API response with playlist info
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.spotify.com/v1/playlists/{playlist_id}",
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        response.raise_for_status()
-        return response.json()
+    key = _cache_key(access_token, "playlist_info", playlist_id)
+    cached = _metadata_cache.get(key)
+    if cached is not None:
+        return cached
+    response = await _get_client().get(
+        f"https://api.spotify.com/v1/playlists/{playlist_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    response.raise_for_status()
+    data = response.json()
+    _metadata_cache.set(key, data)
+    return data
 
 
 async def get_playlist_tracks(
@@ -158,14 +267,60 @@ async def get_playlist_tracks(
     Returns:
         dict: Spotify API response with tracks
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params={"limit": limit, "offset": offset},
-        )
-        response.raise_for_status()
-        return response.json()
+    key = _cache_key(access_token, "playlist_tracks", playlist_id, limit, offset)
+    cached = _metadata_cache.get(key)
+    if cached is not None:
+        return cached
+    response = await _get_client().get(
+        f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"limit": limit, "offset": offset},
+    )
+    response.raise_for_status()
+    data = response.json()
+    _metadata_cache.set(key, data)
+    return data
+
+
+async def get_all_playlist_tracks(access_token: str, playlist_id: str) -> List[Dict]:
+    """
+    Get every track in a playlist, paginating past Spotify's 100-item cap.
+
+    Mirrors get_all_user_playlists: the first page reports the total, so
+    the remaining offsets are fetched concurrently behind a small
+    semaphore rather than one page per round-trip. Pages come through
+    get_playlist_tracks and therefore share its metadata cache.
+
+    Args:
+        access_token: Valid Spotify access token
+        playlist_id: Spotify playlist ID
+
+    Returns:
+        list: All track items, in offset order
+    """
+    page_size = 100
+    first_page = await get_playlist_tracks(
+        access_token, playlist_id, limit=page_size, offset=0
+    )
+    items = list(first_page.get("items", ()))
+    total = first_page.get("total", len(items))
+    if total <= page_size:
+        return items
+
+    semaphore = asyncio.Semaphore(5)
+
+    async def _fetch_page(offset: int) -> Dict:
+        async with semaphore:
+            return await get_playlist_tracks(
+                access_token, playlist_id, limit=page_size, offset=offset
+            )
+
+    pages = await asyncio.gather(
+        *(_fetch_page(offset) for offset in range(page_size, total, page_size))
+    )
+    for page in pages:
+        items.extend(page.get("items", ()))
+    return items
 
 
 async def get_audio_features(access_token: str, track_ids: List[str]) -> Dict:
@@ -181,15 +336,31 @@ async def get_audio_features(access_token: str, track_ids: List[str]) -> Dict:
     """
     if len(track_ids) > 100:
         raise ValueError("Maximum 100 track IDs allowed per request")
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
+
+    found: Dict[str, Dict] = {}
+    missing = []
+    for track_id in track_ids:
+        cached = _audio_features_cache.get(track_id)
+        if cached is not None:
+            found[track_id] = cached
+        else:
+            missing.append(track_id)
+
+    if missing:
+        response = await _get_client().get(
             "https://api.spotify.com/v1/audio-features",
             headers={"Authorization": f"Bearer {access_token}"},
-            params={"ids": ",".join(track_ids)},
+            params={"ids": ",".join(missing)},
         )
         response.raise_for_status()
-        return response.json()
+        for features in response.json().get("audio_features", ()):
+            # Spotify returns null for tracks without features — those
+            # stay uncached and come back as None below, as before.
+            if isinstance(features, dict) and features.get("id"):
+                _audio_features_cache.set(features["id"], features)
+                found[features["id"]] = features
+
+    return {"audio_features": [found.get(track_id) for track_id in track_ids]}
 
 
 async def get_track_info(access_token: str, track_id: str) -> Dict:
@@ -203,11 +374,16 @@ async def get_track_info(access_token: str, track_id: str) -> Dict:
     Returns:
         dict: Spotify API response with track info
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.spotify.com/v1/tracks/{track_id}",
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        response.raise_for_status()
-        return response.json()
+    key = _cache_key(access_token, "track_info", track_id)
+    cached = _metadata_cache.get(key)
+    if cached is not None:
+        return cached
+    response = await _get_client().get(
+        f"https://api.spotify.com/v1/tracks/{track_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    response.raise_for_status()
+    data = response.json()
+    _metadata_cache.set(key, data)
+    return data
 
@@ -1,8 +1,126 @@
-import httpx
+import asyncio
+import base64
+import hashlib
+import random
+import time
+
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Optional
-from urllib.parse import urlencode
+from functools import lru_cache
+from typing import Dict, Final, Optional
+from urllib.parse import quote, urlencode
+
+import httpx
+import orjson
+
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.services import http
+
+# Transient Spotify responses worth retrying; auth failures (400/401/403)
+# raise immediately — retrying those only burns quota.
+_RETRY_STATUSES: Final = frozenset({429, 500, 502, 503, 504})
+_RETRY_ATTEMPTS: Final = 4
+
+_ACCOUNTS_TOKEN_URL: Final = "https://accounts.spotify.com/api/token"
+_AUTHORIZE_BASE_URL: Final = "https://accounts.spotify.com/authorize"
+_API_ME_URL: Final = "https://api.spotify.com/v1/me"
+
+# In-flight refresh requests keyed by refresh token, so a refresh storm
+# (N handlers discovering the same expired token) issues one POST.
+_refresh_inflight: Dict[str, asyncio.Future] = {}
+
+# (access token -> Spotify user id) is invariant for the token's ~1h
+# lifetime, so cache it keyed by a token-hash prefix and expire a bit
+# before the token itself would (3600s minus a 5-minute margin).
+_uid_cache = TTLCache(maxsize=10_000, ttl=3300)
+
+
+class _SlidingWindowLimiter:
+    """Client-side admission limiter for outbound Spotify calls.
+
+    Allows at most max_rate acquisitions per time_period, tracked as a
+    deque of recent timestamps; excess callers sleep until the oldest
+    event ages out of the window. After an observed 429 the effective
+    rate halves for 60s, backing off before Spotify has to deny more
+    requests.
+    """
+
+    def __init__(self, max_rate: int, time_period: float = 1.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._events: deque = deque()
+        self._lock = asyncio.Lock()
+        self._penalty_until = 0.0
+
+    def penalize(self) -> None:
+        """Record a server-side 429; halve the admission rate for 60s."""
+        self._penalty_until = time.monotonic() + 60.0
+
+    def _effective_rate(self) -> int:
+        if time.monotonic() < self._penalty_until:
+            return max(1, self.max_rate // 2)
+        return self.max_rate
+
+    async def acquire(self) -> None:
+        # The lock stays held while waiting, so blocked callers are
+        # admitted in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                window_start = now - self.time_period
+                while self._events and self._events[0] <= window_start:
+                    self._events.popleft()
+                if len(self._events) < self._effective_rate():
+                    self._events.append(now)
+                    return
+                await asyncio.sleep(self._events[0] - window_start)
+
+
+# Spotify rate-limits the accounts host much harder than the API host.
+_accounts_limiter = _SlidingWindowLimiter(max_rate=20)
+_api_limiter = _SlidingWindowLimiter(max_rate=100)
+
+
+async def _request_with_retry(method: str, url: str, **kwargs) -> httpx.Response:
+    """Issue a Spotify request, retrying transient failures with backoff.
+
+    Exponential backoff with jitter between attempts; a Retry-After
+    header on 429 overrides the computed delay. The last attempt's
+    error propagates unchanged, so callers see the same exceptions as
+    a direct call.
+    """
+    limiter = (
+        _accounts_limiter if "accounts.spotify.com" in url else _api_limiter
+    )
+    for attempt in range(_RETRY_ATTEMPTS):
+        await limiter.acquire()
+        try:
+            response = await http.get_client().request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            if status_code == 429:
+                limiter.penalize()
+            if status_code not in _RETRY_STATUSES or attempt == _RETRY_ATTEMPTS - 1:
+                raise
+            retry_after = e.response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = min(2**attempt, 30) * random.uniform(0.5, 1.0)
+        await asyncio.sleep(delay)
+
+
+def _parse(response) -> Dict:
+    """Decode a JSON response body with orjson (same codec the app uses
+    for its own responses). Falls back to .json() for doubles that don't
+    carry raw bytes."""
+    content = getattr(response, "content", None)
+    if content:
+        return orjson.loads(content)
+    return response.json()
 
 
 def _ensure_spotify_config():
@@ -15,26 +133,52 @@ def _ensure_spotify_config():
         raise ValueError("Spotify redirect URI is not configured")
 
 
+@lru_cache(maxsize=8)
+def _basic_auth_header(client_id: str, client_secret: str) -> str:
+    """Base64-encode the client credentials once per config.
+
+    httpx re-encodes an auth= tuple on every request; sending the
+    prebuilt header also lets HTTP/2 HPACK-index it across calls.
+    """
+    raw = f"{client_id}:{client_secret}".encode()
+    return "Basic " + base64.b64encode(raw).decode()
+
+
+@lru_cache(maxsize=8)
+def _authorize_url_prefix(client_id: str, redirect_uri: str, scope: str) -> str:
+    """urlencode the invariant authorize-URL fields once per config.
+
+    Keyed on the settings values (not read inside) so tests that
+    monkeypatch settings get a fresh prefix instead of a stale cache.
+    """
+    return _AUTHORIZE_BASE_URL + "?" + urlencode(
+        {
+            "client_id": client_id,
+            "response_type": "code",
+            "redirect_uri": redirect_uri,
+            "scope": scope,
+        }
+    )
+
+
 def generate_authorize_url(state: str) -> str:
     """
     Generate Spotify OAuth authorization URL.
-    
+
     Args:
         state: CSRF protection state parameter
-        
+
     Returns:
         str: Spotify authorization URL
     """
     _ensure_spotify_config()
-    params = {
-        "client_id": settings.SPOTIFY_CLIENT_ID,
-        "response_type": "code",
-        "redirect_uri": settings.SPOTIFY_REDIRECT_URI,
-        "scope": settings.SPOTIFY_SCOPES,
-        "state": state,
-    }
-    
-    return f"https://accounts.spotify.com/authorize?{urlencode(params)}"
+    prefix = _authorize_url_prefix(
+        settings.SPOTIFY_CLIENT_ID,
+        settings.SPOTIFY_REDIRECT_URI,
+        settings.SPOTIFY_SCOPES,
+    )
+    # Only state varies per login; quote it and append.
+    return f"{prefix}&state={quote(state, safe='')}"
 
 
 async def exchange_code_for_tokens(code: str) -> Dict[str, any]:
@@ -48,19 +192,34 @@ async def exchange_code_for_tokens(code: str) -> Dict[str, any]:
         dict: Contains access_token, refresh_token, expires_in, token_type
     """
     _ensure_spotify_config()
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.spotify.com/api/token",
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": settings.SPOTIFY_REDIRECT_URI,
-            },
-            auth=(settings.SPOTIFY_CLIENT_ID, settings.SPOTIFY_CLIENT_SECRET),
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await _request_with_retry(
+        "POST",
+        _ACCOUNTS_TOKEN_URL,
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": settings.SPOTIFY_REDIRECT_URI,
+        },
+        headers={
+            "Authorization": _basic_auth_header(
+                settings.SPOTIFY_CLIENT_ID, settings.SPOTIFY_CLIENT_SECRET
+            ),
+            "Content-Type": "application/x-www-form-urlencoded",
+        },
+    )
+    data = _parse(response)
+
+    # The callback always resolves the Spotify user id next, so fetch
+    # /v1/me here — it rides the same HTTP/2 connection as the token
+    # POST and warms the uid cache. Best-effort: on failure callers
+    # fall back to calling get_spotify_user_id themselves.
+    access_token = data.get("access_token")
+    if access_token:
+        try:
+            data["spotify_user_id"] = await get_spotify_user_id(access_token)
+        except httpx.HTTPError:
+            pass
+    return data
 
 
 async def refresh_access_token(refresh_token: str) -> Dict[str, any]:
@@ -74,18 +233,41 @@ async def refresh_access_token(refresh_token: str) -> Dict[str, any]:
         dict: Contains access_token, expires_in, token_type
     """
     _ensure_spotify_config()
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://accounts.spotify.com/api/token",
+
+    # Concurrent callers holding the same refresh token share one POST.
+    # Spotify may rotate the token on refresh, so parallel refreshes
+    # don't just waste round-trips — they race each other's new tokens.
+    inflight = _refresh_inflight.get(refresh_token)
+    if inflight is not None:
+        return await inflight
+
+    future = asyncio.get_running_loop().create_future()
+    _refresh_inflight[refresh_token] = future
+    try:
+        response = await _request_with_retry(
+            "POST",
+            _ACCOUNTS_TOKEN_URL,
             data={
                 "grant_type": "refresh_token",
                 "refresh_token": refresh_token,
             },
-            auth=(settings.SPOTIFY_CLIENT_ID, settings.SPOTIFY_CLIENT_SECRET),
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            headers={
+                "Authorization": _basic_auth_header(
+                    settings.SPOTIFY_CLIENT_ID, settings.SPOTIFY_CLIENT_SECRET
+                ),
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
         )
-        response.raise_for_status()
-        return response.json()
+        data = _parse(response)
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved for the no-waiter case
+        raise
+    else:
+        future.set_result(data)
+        return data
+    finally:
+        _refresh_inflight.pop(refresh_token, None)
 
 
 async def get_spotify_user_id(access_token: str) -> str:
@@ -98,14 +280,18 @@ async def get_spotify_user_id(access_token: str) -> str:
     Returns:
         str: Spotify user ID
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.spotify.com/v1/me",
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["id"]
+    key = hashlib.sha256(access_token.encode()).hexdigest()[:16]
+    cached = _uid_cache.get(key)
+    if cached is not None:
+        return cached
+    response = await _request_with_retry(
+        "GET",
+        _API_ME_URL,
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    data = _parse(response)
+    _uid_cache.set(key, data["id"])
+    return data["id"]
 
 
 
@@ -0,0 +1,23 @@
+CREATE TABLE IF NOT EXISTS spotify_connections (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    -- UNIQUE both backs the PostgREST upsert (on_conflict=user_id) and
+    -- serves as the index for the per-user lookup every token fetch does.
+    user_id UUID NOT NULL UNIQUE REFERENCES auth.users(id) ON DELETE CASCADE,
+    spotify_user_id TEXT NOT NULL,
+    access_token TEXT NOT NULL,
+    refresh_token TEXT NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- RLS (defense-in-depth; service role key bypasses these, anon key does not)
+ALTER TABLE spotify_connections ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own spotify connection"
+    ON spotify_connections FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete own spotify connection"
+    ON spotify_connections FOR DELETE
+    USING (auth.uid() = user_id);
@@ -0,0 +1,35 @@
+"""Shared pytest fixtures.
+
+There is no database engine to stand up per test — the backend talks to
+Supabase over PostgREST — so the reusable piece here is an in-memory
+fake of the async postgrest helpers backing spotify_connections.
+"""
+import pytest
+
+from app.services import spotify_api
+
+
+@pytest.fixture
+def spotify_connection_store(monkeypatch):
+    """Patch the postgrest helpers with an in-memory record list.
+
+    Tests append connection rows to the returned list; select_one and
+    update then behave like the real table for those rows.
+    """
+    records = []
+
+    async def fake_select_one(table, filters, columns="*"):
+        assert table == "spotify_connections"
+        wanted = filters["user_id"].removeprefix("eq.")
+        return next((r for r in records if r["user_id"] == wanted), None)
+
+    async def fake_update(table, filters, changes):
+        assert table == "spotify_connections"
+        wanted = filters["id"].removeprefix("eq.")
+        record = next(r for r in records if str(r["id"]) == wanted)
+        record.update(changes)
+        return [record]
+
+    monkeypatch.setattr(spotify_api.postgrest, "select_one", fake_select_one)
+    monkeypatch.setattr(spotify_api.postgrest, "update", fake_update)
+    return records
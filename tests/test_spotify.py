@@ -1,5 +1,6 @@
 import httpx
 import pytest
+import respx
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
@@ -26,54 +27,13 @@ def test_generate_authorize_url_uses_settings(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_get_valid_spotify_token_refreshes_expired(monkeypatch):
+async def test_get_valid_spotify_token_refreshes_expired(
+    monkeypatch, spotify_connection_store
+):
     user_id = uuid4()
     expired_at = datetime.now(timezone.utc) - timedelta(seconds=10)
 
-    # Fake Supabase client/response chain
-    class FakeResp:
-        def __init__(self, data=None, error=None):
-            self.data = data
-            self.error = error
-
-    class FakeTable:
-        def __init__(self, records):
-            self.records = records
-            self._updates = None
-            self._user = None
-
-        def select(self, *args, **kwargs):
-            return self
-
-        def eq(self, field, value):
-            self._user = value
-            return self
-
-        def maybe_single(self):
-            return self
-
-        def update(self, updates):
-            self._updates = updates
-            return self
-
-        def execute(self):
-            if self._updates is not None:
-                rec = self.records[0]
-                rec.update(self._updates)
-                return FakeResp([rec])
-            rec = next(
-                (r for r in self.records if str(r["user_id"]) == self._user), None
-            )
-            return FakeResp(rec)
-
-    class FakeSupabase:
-        def __init__(self, records):
-            self.records = records
-
-        def table(self, name):
-            return FakeTable(self.records)
-
-    records = [
+    spotify_connection_store.append(
         {
             "id": "conn1",
             "user_id": str(user_id),
@@ -83,7 +43,7 @@ async def test_get_valid_spotify_token_refreshes_expired(monkeypatch):
             "expires_at": expired_at.isoformat(),
             "updated_at": None,
         }
-    ]
+    )
 
     async def fake_refresh(token: str):
         return {
@@ -92,12 +52,11 @@ async def test_get_valid_spotify_token_refreshes_expired(monkeypatch):
             "refresh_token": "new_refresh",
         }
 
-    monkeypatch.setattr(spotify_api, "_supabase", FakeSupabase(records))
     monkeypatch.setattr(spotify_api, "refresh_access_token", fake_refresh)
 
     token = await spotify_api.get_valid_spotify_token(user_id)
 
-    updated = records[0]
+    updated = spotify_connection_store[0]
     assert token == "new_token"
     assert updated["access_token"] == "new_token"
     assert updated["refresh_token"] == "new_refresh"
@@ -105,7 +64,8 @@ async def test_get_valid_spotify_token_refreshes_expired(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_get_user_profile(monkeypatch):
+@respx.mock
+async def test_get_user_profile():
     profile_payload = {
         "id": "spotify_user",
         "display_name": "Test User",
@@ -114,38 +74,46 @@ async def test_get_user_profile(monkeypatch):
         "followers": {"total": 42},
         "product": "premium",
     }
+    respx.get("https://api.spotify.com/v1/me").mock(
+        return_value=httpx.Response(200, json=profile_payload)
+    )
 
-    class FakeResponse:
-        def __init__(self, data, status_code=200):
-            self._data = data
-            self.status_code = status_code
-
-        def raise_for_status(self):
-            if self.status_code >= 400:
-                raise httpx.HTTPStatusError(
-                    "error", request=None, response=None
-                )
-
-        def json(self):
-            return self._data
-
-    class FakeAsyncClient:
-        def __init__(self, *args, **kwargs):
-            pass
+    profile = await spotify_api.get_user_profile("token123")
+    assert profile["id"] == "spotify_user"
+    assert profile["display_name"] == "Test User"
+    assert profile["followers"]["total"] == 42
 
-        async def __aenter__(self):
-            return self
 
-        async def __aexit__(self, exc_type, exc_val, exc_tb):
-            return False
+@pytest.mark.asyncio
+@respx.mock
+async def test_exchange_code_for_tokens_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(config_module.settings, "SPOTIFY_CLIENT_ID", "client123")
+    monkeypatch.setattr(config_module.settings, "SPOTIFY_CLIENT_SECRET", "secret456")
+    monkeypatch.setattr(
+        config_module.settings,
+        "SPOTIFY_REDIRECT_URI",
+        "http://localhost:8000/api/v1/spotify/callback",
+    )
 
-        async def get(self, *args, **kwargs):
-            return FakeResponse(profile_payload)
+    token_payload = {
+        "access_token": "new_token",
+        "refresh_token": "new_refresh",
+        "expires_in": 3600,
+        "token_type": "Bearer",
+    }
+    route = respx.post("https://accounts.spotify.com/api/token").mock(
+        side_effect=[
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json=token_payload),
+        ]
+    )
+    respx.get("https://api.spotify.com/v1/me").mock(
+        return_value=httpx.Response(200, json={"id": "spotify_user"})
+    )
 
-    monkeypatch.setattr(httpx, "AsyncClient", FakeAsyncClient)
+    tokens = await spotify_auth.exchange_code_for_tokens("auth_code")
 
-    profile = await spotify_api.get_user_profile("token123")
-    assert profile["id"] == "spotify_user"
-    assert profile["display_name"] == "Test User"
-    assert profile["followers"]["total"] == 42
+    assert tokens["access_token"] == "new_token"
+    assert tokens["spotify_user_id"] == "spotify_user"
+    assert route.call_count == 2
 